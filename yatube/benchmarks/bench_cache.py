@@ -0,0 +1,70 @@
+"""Operations of the memory, file and shared SQLite cache backends.
+
+The memory cache is the fastest, but every web process has its own
+copy; the file and SQLite caches are shared by the processes of a host.
+"""
+import shutil
+import tempfile
+
+from benchmarks.utils import benchmark_db, best_of, print_table
+
+OPERATIONS = 200
+MANY = 20
+VALUE = {'html': 'x' * 2000, 'count': 10}
+
+
+def make_caches(directory):
+    from django.core.cache.backends.filebased import FileBasedCache
+    from django.core.cache.backends.locmem import LocMemCache
+
+    from core.cache_backends import SQLiteCache
+
+    options = {'OPTIONS': {'MAX_ENTRIES': 10000}}
+    return {
+        'locmem': LocMemCache('bench', options),
+        'file': FileBasedCache(f'{directory}/file', options),
+        'sqlite': SQLiteCache(f'{directory}/cache.sqlite3', options),
+    }
+
+
+def operations(backend):
+    keys = [f'key{number}' for number in range(MANY)]
+    backend.set_many({key: VALUE for key in keys})
+    backend.set('counter', 0)
+    return {
+        'get': lambda: backend.get('key0'),
+        'get miss': lambda: backend.get('missing'),
+        'set': lambda: backend.set('key0', VALUE),
+        'incr': lambda: backend.incr('counter'),
+        f'get_many {MANY}': lambda: backend.get_many(keys),
+        f'set_many {MANY}': lambda: backend.set_many(
+            {key: VALUE for key in keys}),
+    }
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        caches = make_caches(directory)
+        rows = []
+        names = list(operations(caches['locmem']))
+        timings = {
+            backend: {
+                name: best_of(lambda: [
+                    operation() for _ in range(OPERATIONS)]) / OPERATIONS
+                for name, operation in operations(cache).items()
+            }
+            for backend, cache in caches.items()
+        }
+        for name in names:
+            rows.append([name] + [f'{timings[backend][name] * 1000:.1f}'
+                                  for backend in caches])
+        print_table(['operation'] + [f'{backend} us' for backend in caches],
+                    rows)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    with benchmark_db():
+        main()
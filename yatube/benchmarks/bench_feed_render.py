@@ -0,0 +1,75 @@
+"""Rendering time of a feed page of posts: one include of the article
+template per post, as the feeds did before, and the single-pass
+{% articles %} tag.
+"""
+from benchmarks.utils import benchmark_db, best_of, print_table
+
+PAGE_SIZES = (10, 50, 200)
+
+INCLUDE_TEMPLATE = (
+    '{% for post in page_obj %}'
+    '<article>{% include "article.html" %}</article>'
+    '{% if not forloop.last %}<hr>{% endif %}'
+    '{% endfor %}'
+)
+# The links of posts/includes/article.html as they were resolved per post
+PER_POST_LINKS = {
+    '{{ links.group }}': '{{ post.group.get_absolute_url }}',
+    '{{ links.profile }}':
+        "{% url 'posts:profile' username=post.author.username %}",
+    '{{ links.detail }}': '{{ post.get_absolute_url }}',
+}
+ARTICLES_TEMPLATE = (
+    '{% load articles %}{% articles page_obj as rendered %}'
+    '{% for article in rendered %}'
+    '<article>{{ article }}</article>'
+    '{% if not forloop.last %}<hr>{% endif %}'
+    '{% endfor %}'
+)
+
+
+def main():
+    from django.template import Context, Engine, engines
+    from django.template.loader import get_template
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    from posts.models import Group, Post, User
+
+    author = User.objects.create(username='bench')
+    group = Group.objects.create(title='Bench', slug='bench')
+    Post.objects.bulk_create([
+        Post(text=f'Benchmark post {num}', author=author, group=group)
+        for num in range(max(PAGE_SIZES))
+    ])
+    article = get_template('posts/includes/article.html').template.source
+    for link, per_post in PER_POST_LINKS.items():
+        article = article.replace(link, per_post)
+    article = ('{% with request.resolver_match.view_name as view_name %}'
+               f'{article}{{% endwith %}}')
+    include_engine = Engine(
+        loaders=[('django.template.loaders.locmem.Loader',
+                  {'article.html': article})])
+    templates = {
+        'include': include_engine.from_string(INCLUDE_TEMPLATE),
+        'articles': engines['django'].engine.from_string(ARTICLES_TEMPLATE),
+    }
+
+    rows = []
+    for size in PAGE_SIZES:
+        posts = list(Post.objects.for_feed()[:size])
+        row = [size]
+        for template in templates.values():
+            def render():
+                request = RequestFactory().get('/')
+                request.resolver_match = resolve('/')
+                template.render(Context(
+                    {'page_obj': posts, 'request': request}))
+            row.append(f'{best_of(render):.1f}')
+        rows.append(row)
+    print_table(('posts', 'include ms', 'articles ms'), rows)
+
+
+if __name__ == '__main__':
+    with benchmark_db():
+        main()
@@ -0,0 +1,72 @@
+"""Searching post texts with LIKE '%term%', as the admin did, and with
+the full-text index, for a rare, a common and a missing word.
+
+    python -m benchmarks.bench_search [posts]
+
+The default of 200 000 posts is seeded in under a minute; the LIKE scan
+grows with the number of posts, the indexed search with the matches.
+"""
+import random
+import sys
+from itertools import accumulate
+
+from benchmarks.utils import benchmark_db, best_of, print_table
+
+POSTS = 200_000
+WORDS_PER_POST = 30
+VOCABULARY = 20_000
+BATCH = 10_000
+PAGE = 10
+
+
+def seed(count):
+    from django.db import models
+
+    from posts import search
+    from posts.models import Post, User
+
+    author = User.objects.create(username='bench')
+    rng = random.Random(0)
+    # The ending keeps a word from being a substring of another one, so
+    # LIKE and the index find the same posts.
+    words = [f'слово{number}ю' for number in range(VOCABULARY)]
+    # Zipf-like frequencies: a few words are in most posts.
+    weights = list(accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+    for start in range(0, count, BATCH):
+        # Plain bulk_create, the index is filled once below.
+        models.QuerySet(Post).bulk_create([
+            Post(text=' '.join(rng.choices(
+                words, cum_weights=weights, k=WORDS_PER_POST)), author=author)
+            for _ in range(min(BATCH, count - start))
+        ])
+    search.rebuild()
+    return {'rare': words[-1], 'common': words[1], 'missing': 'отсутствует'}
+
+
+def main(count):
+    from posts import search
+    from posts.models import Post
+
+    terms = seed(count)
+
+    def like(term):
+        posts = Post.objects.filter(text__icontains=term)
+        return posts.count(), list(posts.order_by('-pub_date')[:PAGE])
+
+    def indexed(term):
+        results = search.search(term)
+        return results.count(), results[0:PAGE]
+
+    rows = []
+    for name, term in terms.items():
+        matches = like(term)[0]
+        rows.append([name, matches,
+                     f'{best_of(lambda: like(term), repeat=3):.1f}',
+                     f'{best_of(lambda: indexed(term), repeat=3):.1f}'])
+    print(f'{count} posts')
+    print_table(('word', 'matches', 'LIKE ms', 'FTS5 ms'), rows)
+
+
+if __name__ == '__main__':
+    with benchmark_db():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else POSTS)
@@ -0,0 +1,54 @@
+"""Queries and time of cheap authenticated requests with database
+sessions and users, and with both read from the cache.
+"""
+from benchmarks.utils import benchmark_db, best_of, print_table
+
+MODES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': [
+            'django.contrib.auth.backends.ModelBackend'],
+    },
+    'cached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'AUTHENTICATION_BACKENDS': ['users.backends.CachedModelBackend'],
+    },
+}
+
+
+def main():
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, override_settings
+    from django.urls import reverse
+
+    from posts.models import Follow, User
+
+    reader = User.objects.create(username='reader')
+    author = User.objects.create(username='author')
+    Follow.objects.create(user=reader, author=author)
+    urls = {
+        'about:author': reverse('about:author'),
+        'posts:profile_follow': reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}),
+    }
+    rows = []
+    for name, url in urls.items():
+        row = [name]
+        for settings in MODES.values():
+            with override_settings(**settings):
+                client = Client()
+                client.force_login(reader)
+                client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url)
+                row.append(len(queries))
+                row.append(f'{best_of(lambda: client.get(url)):.2f}')
+        rows.append(row)
+    print_table(('request', 'db queries', 'db ms', 'cached queries',
+                 'cached ms'), rows)
+
+
+if __name__ == '__main__':
+    with benchmark_db():
+        main()
@@ -0,0 +1,51 @@
+"""Time to first byte and total time of the index page, rendered at once
+and streamed, for different page sizes.
+"""
+from unittest import mock
+
+from benchmarks.utils import benchmark_db, best_of, print_table
+
+PAGE_SIZES = (10, 50, 200)
+
+
+def main():
+    from django.core.cache import cache
+    from django.test import Client
+
+    from posts.models import Post, User
+
+    author = User.objects.create(username='bench')
+    Post.objects.bulk_create([
+        Post(text=f'Benchmark post {num} ' * 20, author=author)
+        for num in range(max(PAGE_SIZES))
+    ])
+    client = Client()
+
+    def first_byte():
+        cache.clear()
+        response = client.get('/')
+        if response.streaming:
+            next(iter(response.streaming_content))
+
+    def full_page():
+        cache.clear()
+        response = client.get('/')
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    rows = []
+    for size in PAGE_SIZES:
+        with mock.patch('posts.views.PAGINATOR_NUM_PAGE', size):
+            row = [size]
+            for views in ([], ['posts:index']):
+                with mock.patch('posts.views.STREAMING_VIEWS', views):
+                    row.append(f'{best_of(first_byte):.1f}')
+                    row.append(f'{best_of(full_page):.1f}')
+            rows.append(row)
+    print_table(('posts', 'render ttfb ms', 'render total ms',
+                 'stream ttfb ms', 'stream total ms'), rows)
+
+
+if __name__ == '__main__':
+    with benchmark_db():
+        main()
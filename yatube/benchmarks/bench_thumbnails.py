@@ -0,0 +1,79 @@
+"""Cache round-trips, queries and time of a feed page's images: resolved
+per post by the sorl thumbnail tag, and read from the stored variants.
+"""
+import shutil
+import tempfile
+from io import BytesIO
+
+from benchmarks.utils import (benchmark_db, best_of, count_cache_calls,
+                              print_table)
+
+PAGE_SIZES = (10, 50)
+
+SORL_TEMPLATE = (
+    '{% load thumbnail %}{% for post in posts %}'
+    '{% thumbnail post.image "960x339" crop="center" upscale=True as im %}'
+    '<img src="{{ im.url }}">{% endthumbnail %}{% endfor %}'
+)
+STORED_TEMPLATE = (
+    '{% for post in posts %}'
+    '<img src="{{ post.thumbnail_url }}"'
+    ' srcset="{{ post.image_srcset.jpeg }}">'
+    '{% endfor %}'
+)
+
+
+def main():
+    from django.core.files.base import ContentFile
+    from django.db import connection
+    from django.template import Context, Template
+    from django.test.utils import CaptureQueriesContext
+    from PIL import Image
+
+    from posts.models import Post, User
+    from posts.thumbnails import make_thumbnails
+
+    buffer = BytesIO()
+    Image.new('RGB', (1600, 1200), 'teal').save(buffer, 'JPEG')
+    author = User.objects.create(username='bench')
+    for num in range(max(PAGE_SIZES)):
+        post = Post.objects.create(
+            text=f'Benchmark post {num}', author=author,
+            image=ContentFile(buffer.getvalue(), name=f'bench{num}.jpg'))
+        make_thumbnails(post.pk)
+
+    rows = []
+    for size in PAGE_SIZES:
+        posts = list(Post.objects.for_feed()[:size])
+        for name, source in (('sorl tag', SORL_TEMPLATE),
+                             ('stored variants', STORED_TEMPLATE)):
+            template = Template(source)
+
+            def render():
+                template.render(Context({'posts': posts}))
+
+            render()
+            with count_cache_calls() as calls, \
+                    CaptureQueriesContext(connection) as queries:
+                render()
+            rows.append((size, name, sum(calls.values()), len(queries),
+                         f'{best_of(render):.1f}'))
+    print_table(('posts', 'images', 'cache calls', 'queries', 'render ms'),
+                rows)
+
+
+if __name__ == '__main__':
+    media_root = tempfile.mkdtemp()
+    try:
+        with benchmark_db():
+            from django.test import override_settings
+
+            # sorl names its thumbnails and checks that they exist, so
+            # they are not stored by content hash as uploads are.
+            with override_settings(
+                    MEDIA_ROOT=media_root,
+                    THUMBNAIL_STORAGE='django.core.files.storage.'
+                                      'FileSystemStorage'):
+                main()
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
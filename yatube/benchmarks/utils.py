@@ -0,0 +1,85 @@
+"""Helpers shared by the benchmark scripts.
+
+Run a benchmark from the yatube/ directory, for example:
+
+    python -m benchmarks.bench_streaming
+
+Every benchmark works on a throwaway test database.
+"""
+import os
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from unittest import mock
+
+import django
+
+
+@contextmanager
+def benchmark_db():
+    """Set up Django with a fresh test database for the benchmark."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    django.setup()
+    from django.db import connection
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def best_of(function, repeat=5):
+    """Return the best wall time of function() in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def print_table(header, rows):
+    """Print rows as aligned columns under the header."""
+    widths = [max(len(str(cell)) for cell in column)
+              for column in zip(header, *rows)]
+    for row in (header, *rows):
+        print('  '.join(str(cell).rjust(width)
+                        for cell, width in zip(row, widths)))
+
+
+CACHE_METHODS = ('get', 'get_many', 'set', 'set_many', 'add', 'incr',
+                 'delete', 'delete_many')
+
+
+@contextmanager
+def count_cache_calls():
+    """Count the calls to the default cache made by the code in the block.
+
+    Calls made by another cache method, like the gets of the default
+    get_many(), are not counted: a real backend does one round-trip.
+    """
+    from django.core.cache import caches
+
+    backend = caches['default']
+    calls = Counter()
+    depth = [0]
+
+    def counting(method):
+        def call(*args, **kwargs):
+            if not depth[0]:
+                calls[method.__name__] += 1
+            depth[0] += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+        return call
+
+    with ExitStack() as stack:
+        for name in CACHE_METHODS:
+            stack.enter_context(mock.patch.object(
+                backend, name, counting(getattr(backend, name))))
+        yield calls
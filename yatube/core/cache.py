@@ -0,0 +1,48 @@
+"""Generation counters for invalidating cached fragments.
+
+A fragment cached under a key that includes the current generation of
+its scope becomes unreachable once the generation is bumped, so cached
+fragments can live long and still never be served stale.
+"""
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'generation'
+
+
+def _key(scope):
+    return f'{KEY_PREFIX}:{scope}'
+
+
+def _new_generation():
+    # A lost counter restarts from the clock, never from a used value.
+    return int(time.time() * 1000)
+
+
+def get_generation(scope):
+    """Return the current generation of the scope."""
+    generation = cache.get(_key(scope))
+    if generation is None:
+        cache.add(_key(scope), _new_generation(), timeout=None)
+        generation = cache.get(_key(scope))
+    return generation
+
+
+def get_generations(scopes):
+    """Return the current generations of the scopes as a dict."""
+    keys = {_key(scope): scope for scope in scopes}
+    generations = cache.get_many(keys)
+    for key in keys.keys() - generations.keys():
+        cache.add(key, _new_generation(), timeout=None)
+        generations[key] = cache.get(key)
+    return {keys[key]: generation for key, generation in generations.items()}
+
+
+def bump_generation(*scopes):
+    """Invalidate every fragment cached for the scopes."""
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.set(_key(scope), _new_generation(), timeout=None)
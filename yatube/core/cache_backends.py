@@ -0,0 +1,267 @@
+"""Cache backend shared by the processes of one host.
+
+Entries live in a SQLite database in WAL mode, so the web workers read
+it concurrently and see one another's writes and invalidations without
+an external service. The cache is bounded by MAX_ENTRIES and by
+MAX_SIZE bytes of values; expired entries are evicted first, then the
+least recently used ones.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube/cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_SIZE': 256 * 2 ** 20},
+        },
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entry_accessed ON entry (accessed);
+CREATE INDEX IF NOT EXISTS entry_expires ON entry (expires);
+CREATE TABLE IF NOT EXISTS total (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO total VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS entry_insert AFTER INSERT ON entry BEGIN
+    UPDATE total SET entries = entries + 1, size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entry_update AFTER UPDATE OF size ON entry
+BEGIN
+    UPDATE total SET size = size - old.size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entry_delete AFTER DELETE ON entry BEGIN
+    UPDATE total SET entries = entries - 1, size = size - old.size;
+END;
+'''
+UPSERT = '''
+INSERT INTO entry (key, value, size, expires, accessed)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET value = excluded.value,
+    size = excluded.size, expires = excluded.expires,
+    accessed = excluded.accessed
+'''
+# UPSERT, used by set() and add(), came with SQLite 3.24.
+MIN_SQLITE_VERSION = (3, 24)
+# Reads record their access time at most this often in seconds, so hot
+# entries are read without taking the write lock.
+ACCESS_RESOLUTION = 1
+# Keys per statement, below the default SQLITE_MAX_VARIABLE_NUMBER.
+CHUNK_SIZE = 500
+
+
+def _encode(value):
+    # Integers are stored as they are, so incr() is a single UPDATE.
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value, 8
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return data, len(data)
+
+
+def _decode(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+class SQLiteCache(BaseCache):
+    """Cache in a SQLite database file shared by the processes of a host.
+
+    OPTIONS take MAX_SIZE, the limit of the stored values in bytes, in
+    addition to MAX_ENTRIES and CULL_FREQUENCY.
+    """
+
+    def __init__(self, location, params):
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise ImproperlyConfigured(
+                'SQLiteCache requires SQLite %s or later, found %s.' % (
+                    '.'.join(map(str, MIN_SQLITE_VERSION)),
+                    sqlite3.sqlite_version))
+        options = dict(params.get('OPTIONS', {}))
+        self._max_size = options.pop('MAX_SIZE', None)
+        super().__init__({**params, 'OPTIONS': options})
+        self._path = location
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # Connections are neither shared between threads nor inherited
+        # by the forked workers.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            local.connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode = WAL')
+            # The cache may lose the last writes on power loss.
+            local.connection.execute('PRAGMA synchronous = NORMAL')
+            local.connection.executescript(SCHEMA)
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _touch(self, rows, now):
+        """Record the access of the rows read long enough ago."""
+        stale = [(now, key) for key, accessed in rows
+                 if now - accessed > ACCESS_RESOLUTION]
+        if stale:
+            with self._write() as connection:
+                connection.executemany(
+                    'UPDATE entry SET accessed = ? WHERE key = ?', stale)
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute(
+            'SELECT entries, size FROM total').fetchone()
+        if entries <= self._max_entries and (
+                self._max_size is None or size <= self._max_size):
+            return
+        connection.execute('DELETE FROM entry WHERE expires <= ?', (now,))
+        if not self._cull_frequency:
+            connection.execute('DELETE FROM entry')
+            return
+        while True:
+            entries, size = connection.execute(
+                'SELECT entries, size FROM total').fetchone()
+            if entries <= self._max_entries and (
+                    self._max_size is None or size <= self._max_size):
+                return
+            connection.execute(
+                'DELETE FROM entry WHERE key IN (SELECT key FROM entry '
+                'ORDER BY accessed LIMIT ?)',
+                (max(entries // self._cull_frequency, 1),))
+
+    def _set_rows(self, data, timeout, version):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = []
+        for key, value in data.items():
+            value, size = _encode(value)
+            rows.append((self._key(key, version), value, size, expires, now))
+        with self._write() as connection:
+            connection.executemany(UPSERT, rows)
+            self._cull(connection, now)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        value, size = _encode(value)
+        with self._write() as connection:
+            added = connection.execute(
+                UPSERT + 'WHERE entry.expires <= ?',
+                (key, value, size, self.get_backend_timeout(timeout), now,
+                 now)).rowcount
+            self._cull(connection, now)
+        return bool(added)
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        now = time.time()
+        found, accessed = {}, []
+        for chunk in _chunks(list(keys)):
+            placeholders = ', '.join('?' * len(chunk))
+            for key, value, row_accessed in self._connection.execute(
+                    'SELECT key, value, accessed FROM entry '
+                    f'WHERE key IN ({placeholders}) '
+                    'AND (expires IS NULL OR expires > ?)', (*chunk, now)):
+                found[keys[key]] = _decode(value)
+                accessed.append((key, row_accessed))
+        self._touch(accessed, now)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set_rows({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set_rows(data, timeout, version)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            return bool(connection.execute(
+                'UPDATE entry SET expires = ?, accessed = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now)).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        # The value is read back in the write transaction, not with
+        # RETURNING, which needs SQLite 3.35.
+        with self._write() as connection:
+            updated = connection.execute(
+                'UPDATE entry SET value = value + ?, accessed = ? '
+                "WHERE key = ? AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?)',
+                (delta, now, key, now)).rowcount
+            row = connection.execute(
+                'SELECT value FROM entry WHERE key = ?', (key,)).fetchone()
+        if not updated:
+            raise ValueError("Key '%s' not found" % key)
+        return row[0]
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._write() as connection:
+            for chunk in _chunks(keys):
+                connection.execute(
+                    'DELETE FROM entry WHERE key IN (%s)'
+                    % ', '.join('?' * len(chunk)), chunk)
+
+    def has_key(self, key, version=None):
+        return self._connection.execute(
+            'SELECT 1 FROM entry WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())).fetchone() is not None
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM entry')
+
+    def close(self, **kwargs):
+        # The connection of the thread is kept between requests.
+        pass
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when the processes of a deployment keep separate caches."""
+    backend = settings.CACHES['default']['BACKEND']
+    if not backend.endswith('LocMemCache'):
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint='Set CACHE_LOCATION when running several web processes: '
+             'cache generations, lookups and follow sets are invalidated '
+             'across processes only through a shared cache.',
+        id='core.W001',
+    )]
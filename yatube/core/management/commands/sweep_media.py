@@ -0,0 +1,17 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.storage import sweep
+
+
+class Command(BaseCommand):
+    help = ('Delete the stored files left without references for longer '
+            'than STORED_FILE_GRACE_PERIOD.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-period', type=int, default=None,
+                            help='Seconds since the last reference.')
+
+    def handle(self, *args, **options):
+        swept = sweep(default_storage, options['grace_period'])
+        self.stdout.write(self.style.SUCCESS(f'{swept} files deleted'))
@@ -0,0 +1,110 @@
+"""Helpers of the media serving view.
+
+Files are handed to the front server with X-Accel-Redirect or
+X-Sendfile when MEDIA_SENDFILE is set. Otherwise FileResponse streams
+them; WSGI servers with wsgi.file_wrapper send whole files with
+sendfile(), ranges are read in chunks.
+"""
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .storage import is_hashed
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    """The requested range starts after the end of the file."""
+
+
+class FileRange:
+    """File object reading at most length bytes from the current offset."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return the (first, last) byte positions of a single byte range.
+
+    None means the whole file is sent: there is no range, or several
+    ranges are requested, which the view does not support.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise RangeNotSatisfiable(header)
+    return first, last
+
+
+def cache_headers(response, name, mtime, max_age):
+    """Set the validators and lifetime of a media response."""
+    response['Last-Modified'] = http_date(mtime)
+    # A content-addressed name always refers to the same content.
+    immutable = ', immutable' if is_hashed(name) else ''
+    response['Cache-Control'] = f'public, max-age={max_age}{immutable}'
+    return response
+
+
+def sendfile_response(path, full_path, content_type):
+    """Return an empty response telling the front server to send the file."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(
+            path)
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def file_response(request, full_path, stat_result, content_type):
+    """Return the file, its byte range or 304 Not Modified."""
+    size, mtime = stat_result.st_size, stat_result.st_mtime
+    if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime, size):
+        return HttpResponseNotModified()
+    byte_range = None
+    last_modified = http_date(mtime)
+    # A range of a file changed since If-Range is not sent.
+    if request.META.get('HTTP_IF_RANGE', last_modified) == last_modified:
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        first, last = byte_range
+        file.seek(first)
+        response = FileResponse(FileRange(file, last - first + 1),
+                                status=206, content_type=content_type)
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
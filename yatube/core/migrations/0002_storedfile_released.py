@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='released',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """References to a file of the content-addressed storage."""
+    name = models.CharField(max_length=255, primary_key=True)
+    references = models.PositiveIntegerField(default=0)
+    # When the file lost its last reference, None while it has any.
+    released = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,115 @@
+"""Whole-page cache for anonymous visitors.
+
+Views opt in by tagging the response with surrogate keys naming the
+data shown on the page. Every key has a generation (see core.cache);
+a cached page is served only while the generations it was rendered
+with are current, so purge() drops every page tagged with a key at
+once. The keys are sent in the Surrogate-Key header too, and
+keys_purged lets a deployment purge the same keys upstream.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .cache import bump_generation, get_generations
+
+KEY_PREFIX = 'page'
+
+keys_purged = Signal(providing_args=['keys'])
+
+
+def _scope(key):
+    return f'{KEY_PREFIX}:{key}'
+
+
+def _page_key(request):
+    url = request.build_absolute_uri()
+    return f'{KEY_PREFIX}:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+def add_surrogate_keys(request, *keys):
+    """Tag the response to the request with the keys.
+
+    Call it before reading the data the keys stand for: the page is
+    stored with the generations of the keys at this moment.
+    """
+    if not hasattr(request, 'surrogate_keys'):
+        request.surrogate_keys = {}
+    new_keys = [key for key in keys if key not in request.surrogate_keys]
+    generations = get_generations(_scope(key) for key in new_keys)
+    request.surrogate_keys.update(
+        (key, generations[_scope(key)]) for key in new_keys)
+
+
+def may_cache(request):
+    """Return whether the response to the request may be stored whole."""
+    return (request.method in ('GET', 'HEAD')
+            and not request.user.is_authenticated)
+
+
+def purge(*keys):
+    """Drop every cached page tagged with the keys."""
+    bump_generation(*(_scope(key) for key in keys))
+    keys_purged.send(sender=None, keys=keys)
+
+
+def _is_cacheable(request, response):
+    # A page with a CSRF token or setting cookies belongs to the visitor.
+    return (
+        getattr(request, 'surrogate_keys', None)
+        and not request.META.get('CSRF_COOKIE_USED')
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+        and 'no-store' not in response.get('Cache-Control', '')
+    )
+
+
+def _get_page(request):
+    """Return the cached page if it is still current."""
+    entry = cache.get(_page_key(request))
+    if entry is None:
+        return None
+    keys, response = entry
+    scopes = {_scope(key): generation for key, generation in keys.items()}
+    if get_generations(scopes) != scopes:
+        return None
+    return response
+
+
+class AnonymousPageCacheMiddleware:
+    """Serve the pages tagged with surrogate keys to anonymous visitors
+    from the cache for PAGE_CACHE_TIMEOUT seconds at most.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not may_cache(request):
+            return self._tag(request, self.get_response(request))
+        response = _get_page(request)
+        if response is not None:
+            return get_conditional_response(
+                request, etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    response.get('Last-Modified', '')),
+                response=response)
+        response = self._tag(request, self.get_response(request))
+        if _is_cacheable(request, response):
+            cache.set(_page_key(request),
+                      (request.surrogate_keys, response),
+                      settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+    @staticmethod
+    def _tag(request, response):
+        keys = getattr(request, 'surrogate_keys', None)
+        if keys:
+            response['Surrogate-Key'] = ' '.join(keys)
+        return response
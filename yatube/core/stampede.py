@@ -0,0 +1,81 @@
+"""Cached values protected from stampedes.
+
+When a value expires, the first request to notice takes a lock and
+recomputes it while the others keep serving the stale value. Requests
+with nothing to serve wait for the recomputation instead of repeating
+it. A value is also recomputed a little before it expires, with a
+probability growing as the expiry nears and with the time the
+computation took, so a busy value is usually refreshed before anybody
+sees it expire.
+"""
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'stampede'
+# Seconds a recomputation holds the lock, and others wait for it at most
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f'{KEY_PREFIX}:lock:{key}'
+
+
+def _is_fresh(expires, duration, beta):
+    # Probabilistic early expiration ("XFetch"): the expiry is moved
+    # closer by a random multiple of the time the value took to compute.
+    early = -duration * beta * math.log(1 - random.random())
+    return time.time() + early < expires
+
+
+def _compute(key, compute, timeout, stale_timeout):
+    """Compute and store the value under the lock, then release it."""
+    try:
+        start = time.monotonic()
+        value = compute()
+        duration = time.monotonic() - start
+        cache.set(key, (value, duration, time.time() + timeout),
+                  timeout + stale_timeout)
+    finally:
+        cache.delete(_lock_key(key))
+    return value
+
+
+def _wait(key, compute, timeout, stale_timeout):
+    """Return the value computed by the lock holder or compute it."""
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(_lock_key(key), True, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    # The value may have been stored before the lock was taken.
+    entry = cache.get(key)
+    if entry is not None:
+        cache.delete(_lock_key(key))
+        return entry[0]
+    return _compute(key, compute, timeout, stale_timeout)
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None, beta=1.0):
+    """Return the cached value of key, calling compute() to make it.
+
+    The value is fresh for timeout seconds and is served stale while it
+    is recomputed for stale_timeout seconds more, timeout by default.
+    A larger beta recomputes earlier.
+    """
+    if stale_timeout is None:
+        stale_timeout = timeout
+    entry = cache.get(key)
+    if entry is None:
+        return _wait(key, compute, timeout, stale_timeout)
+    value, duration, expires = entry
+    if _is_fresh(expires, duration, beta) or not cache.add(
+            _lock_key(key), True, LOCK_TIMEOUT):
+        return value
+    return _compute(key, compute, timeout, stale_timeout)
@@ -0,0 +1,139 @@
+"""Content-addressed storage of uploaded files.
+
+A file is stored under the SHA-256 of its content in two levels of
+shard directories, e.g. posts/3f/a2/3fa2...c1.jpg, so no directory grows
+large and identical uploads share one file. StoredFile rows count the
+references to each file. A file left without references is deleted by
+sweep() once STORED_FILE_GRACE_PERIOD has passed, unless an upload of
+the same content refers to it again meanwhile.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import StoredFile
+from .tasks import run_in_background
+
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME.search(name))
+
+
+def _hashed_name(name, chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    extension = os.path.splitext(name)[1].lower()
+    return posixpath.join(posixpath.dirname(name), digest[:2], digest[2:4],
+                          digest + extension)
+
+
+class HashedStorage(FileSystemStorage):
+    """File system storage naming files by the hash of their content."""
+
+    def get_available_name(self, name, max_length=None):
+        # The name given to save() is replaced by the content hash, and a
+        # hashed name is only taken by the same content.
+        return name
+
+    def _save(self, name, content):
+        name = _hashed_name(name, content.chunks())
+        # A released file found here gets a new grace period before the
+        # check, so sweep() leaves it until the upload retains it, or
+        # has already deleted it and the content is written again.
+        StoredFile.objects.filter(name=name, references=0).update(
+            released=timezone.now())
+        if self.exists(name):
+            return name
+        # The content is written under a unique name and linked to the
+        # hashed one, so a concurrent upload of the same content finds
+        # the whole file there and both uploads refer to it.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        try:
+            os.link(self.path(temporary), self.path(name))
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(self.path(temporary))
+        return name
+
+    def rehash(self, name):
+        """Link a file to its hashed name and return the hashed name and
+        whether the link was made.
+
+        The file keeps its old name, which the caller deletes once
+        nothing refers to it.
+        """
+        with self.open(name) as file:
+            hashed = _hashed_name(name, file.chunks())
+        if self.exists(hashed):
+            return hashed, False
+        os.makedirs(os.path.dirname(self.path(hashed)), exist_ok=True)
+        try:
+            os.link(self.path(name), self.path(hashed))
+        except FileExistsError:
+            return hashed, False
+        return hashed, True
+
+
+def retain(names):
+    """Count a new reference to each of the content-addressed files."""
+    for name in filter(is_hashed, names):
+        _, created = StoredFile.objects.get_or_create(
+            name=name, defaults={'references': 1})
+        if not created:
+            StoredFile.objects.filter(name=name).update(
+                references=F('references') + 1, released=None)
+
+
+def release(names, storage):
+    """Drop a reference to each of the content-addressed files.
+
+    Files left without references are marked released and swept in the
+    background after the grace period. Files under other names, like
+    the ones saved before the storage was content-addressed, are never
+    deleted.
+    """
+    released = False
+    for name in filter(is_hashed, names):
+        StoredFile.objects.filter(name=name, references__gt=0).update(
+            references=F('references') - 1)
+        released |= bool(StoredFile.objects.filter(
+            name=name, references=0, released=None).update(
+                released=timezone.now()))
+    if released:
+        run_in_background(sweep, storage)
+
+
+def sweep(storage, grace_period=None):
+    """Delete the files released longer than the grace period ago and
+    not retained since. Return the number of deleted files.
+    """
+    if grace_period is None:
+        grace_period = settings.STORED_FILE_GRACE_PERIOD
+    cutoff = timezone.now() - timedelta(seconds=grace_period)
+    names = list(StoredFile.objects.filter(
+        references=0, released__lte=cutoff).values_list('name', flat=True))
+    swept = 0
+    for name in names:
+        # The row stays locked until the file is gone, so an upload of
+        # the same content either keeps the row or writes the file anew.
+        with transaction.atomic():
+            deleted, _ = StoredFile.objects.filter(
+                name=name, references=0, released__lte=cutoff).delete()
+            if deleted:
+                storage.delete(name)
+                swept += 1
+    return swept
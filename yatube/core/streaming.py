@@ -0,0 +1,44 @@
+"""Streaming rendering of pages with long lists.
+
+The page template is rendered once with stream_marker in place of the
+list, so the head, header and everything up to the list can be sent
+before the items are rendered one by one.
+"""
+from django.http import StreamingHttpResponse
+from django.template import Context
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+STREAM_MARKER = mark_safe('<!-- stream -->')
+
+
+def stream_template(request, template_name, context, items, render_items,
+                    separator=''):
+    """Yield the page in chunks: the part before the list, every item
+    rendered by render_items(context, items) and the part after the list.
+
+    render_items is a generator yielding the items one by one, so it can
+    load its templates once for the whole list.
+    """
+    template = get_template(template_name)
+    page = template.render(
+        {**context, 'stream_marker': STREAM_MARKER}, request)
+    head, marker, tail = page.partition(STREAM_MARKER)
+    yield head
+    if not marker:
+        return
+    # A plain context: context processors already ran for the page.
+    item_context = Context({'request': request})
+    with item_context.bind_template(template.template):
+        for number, item in enumerate(render_items(item_context, items)):
+            if number:
+                yield separator
+            yield item
+    yield tail
+
+
+def render_stream(request, template_name, context, items, render_items,
+                  separator=''):
+    """Return a StreamingHttpResponse built by stream_template()."""
+    return StreamingHttpResponse(stream_template(
+        request, template_name, context, items, render_items, separator))
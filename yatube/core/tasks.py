@@ -0,0 +1,45 @@
+"""Local worker for slow work that should not hold up a response.
+
+Tasks run in a thread pool of the web process once the current
+transaction commits, so they see the saved data. With
+BACKGROUND_TASKS_EAGER they run at once in the calling thread.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='background')
+    return _executor
+
+
+def _run(function, args, kwargs):
+    try:
+        function(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', function.__qualname__)
+    finally:
+        connection.close()
+
+
+def run_in_background(function, *args, **kwargs):
+    """Run the function in the local worker after the transaction commits."""
+    if settings.BACKGROUND_TASKS_EAGER:
+        function(*args, **kwargs)
+        return
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run, function, args, kwargs))
@@ -0,0 +1,42 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.stampede import get_or_compute
+
+register = template.Library()
+
+
+class FreshCacheNode(template.Node):
+    def __init__(self, nodelist, timeout_var, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.timeout_var = timeout_var
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = int(self.timeout_var.resolve(context))
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = 'fresh.' + make_template_fragment_key(
+            self.fragment_name, vary_on)
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), timeout)
+
+
+@register.tag('fresh_cache')
+def do_fresh_cache(parser, token):
+    """Cache a template fragment like {% cache %}, rendering it once
+    when it expires while stale copies are served, see core.stampede.
+
+        {% fresh_cache timeout fragment_name var1 var2 %}
+            ...
+        {% endfresh_cache %}
+    """
+    nodelist = parser.parse(('endfresh_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.')
+    return FreshCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]])
@@ -1,6 +1,25 @@
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils.http import http_date
+
+from core.cache import bump_generation, get_generation
+from core.cache_backends import SQLiteCache
+from core.models import StoredFile
+from core.stampede import get_or_compute
+from core.storage import HashedStorage, release, retain, sweep
+from core.tasks import run_in_background
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +27,296 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class GenerationTestClass(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_generation_changes_generation(self):
+        generation = get_generation('test')
+        self.assertEqual(get_generation('test'), generation)
+        bump_generation('test')
+        self.assertNotEqual(get_generation('test'), generation)
+
+    def test_lost_generation_is_not_reused(self):
+        generation = get_generation('test')
+        cache.clear()
+        self.assertGreaterEqual(get_generation('test'), generation)
+        bump_generation('test')
+        self.assertGreater(get_generation('test'), generation)
+
+
+class SQLiteCacheTestClass(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_cache(self, **options):
+        return SQLiteCache(os.path.join(self.directory, 'cache.sqlite3'),
+                           {'OPTIONS': options})
+
+    def test_values_round_trip(self):
+        shared = self.make_cache()
+        shared.set('number', 1)
+        shared.set_many({'text': 'value', 'dict': {'key': [1, 2]}})
+        self.assertEqual(shared.get_many(['number', 'dict', 'missing']),
+                         {'number': 1, 'dict': {'key': [1, 2]}})
+        self.assertEqual(self.make_cache().get('text'), 'value')
+        self.assertFalse(shared.add('text', 'other'))
+        shared.set('expired', 'value', timeout=0)
+        self.assertIsNone(shared.get('expired'))
+        self.assertTrue(shared.add('expired', 'again'))
+        self.assertEqual(shared.get('expired'), 'again')
+        self.assertEqual(shared.incr('number', 2), 3)
+        shared.delete_many(['text', 'number'])
+        self.assertFalse(shared.has_key('text'))
+        with self.assertRaises(ValueError):
+            shared.incr('number')
+
+    def test_old_sqlite_is_refused(self):
+        with mock.patch('core.cache_backends.sqlite3.sqlite_version_info',
+                        (3, 22, 0)):
+            with self.assertRaisesMessage(ImproperlyConfigured, '3.24'):
+                self.make_cache()
+
+    def test_incr_is_atomic_between_processes(self):
+        shared = self.make_cache()
+        shared.set('counter', 0)
+
+        def increment():
+            for _ in range(50):
+                shared.incr('counter')
+
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=increment) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(shared.get('counter'), 200)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        shared = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=4)
+        clock = mock.Mock(time=itertools.count(1000, 10).__next__)
+        with mock.patch('core.cache_backends.time', clock):
+            for number in range(4):
+                shared.set(f'key{number}', number)
+            shared.get('key0')
+            shared.set('key4', 4)
+        self.assertEqual(sorted(shared.get_many(
+            [f'key{number}' for number in range(5)])),
+            ['key0', 'key2', 'key3', 'key4'])
+
+    def test_size_is_limited(self):
+        shared = self.make_cache(MAX_SIZE=1000)
+        for number in range(10):
+            shared.set(f'key{number}', 'x' * 300)
+        self.assertLessEqual(len(shared.get_many(
+            [f'key{number}' for number in range(10)])), 3)
+        self.assertIsNotNone(shared.get('key9'))
+
+
+class StampedeTestClass(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.computations = 0
+        self.lock = threading.Lock()
+
+    def compute(self):
+        with self.lock:
+            self.computations += 1
+        time.sleep(0.2)
+        return 'fresh'
+
+    def get_concurrently(self, threads=8):
+        """Call get_or_compute from several threads at once."""
+        barrier = threading.Barrier(threads)
+        results = []
+
+        def get():
+            barrier.wait()
+            results.append(get_or_compute('key', self.compute, 60))
+
+        workers = [threading.Thread(target=get) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    def test_expired_value_is_recomputed_once(self):
+        """One request recomputes an expired value, others get it stale."""
+        cache.set('key', ('stale', 0, time.time() - 1), 60)
+        results = self.get_concurrently()
+        self.assertEqual(self.computations, 1)
+        self.assertEqual(results.count('fresh'), 1)
+        self.assertEqual(results.count('stale'), 7)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'fresh')
+        self.assertEqual(self.computations, 1)
+
+    def test_missing_value_is_computed_once(self):
+        """Requests without a stale value wait for the one computing it."""
+        self.assertEqual(self.get_concurrently(), ['fresh'] * 8)
+        self.assertEqual(self.computations, 1)
+
+    def test_value_may_be_recomputed_before_expiry(self):
+        """A value close to expiry is recomputed early by chance."""
+        cache.set('key', ('stale', 10, time.time() + 1), 60)
+        with mock.patch('core.stampede.random.random', return_value=0):
+            self.assertEqual(get_or_compute('key', self.compute, 60),
+                             'stale')
+        with mock.patch('core.stampede.random.random', return_value=0.99):
+            self.assertEqual(get_or_compute('key', self.compute, 60),
+                             'fresh')
+
+
+class BackgroundTaskTestClass(TestCase):
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_eager_task_runs_at_once(self):
+        task = mock.Mock()
+        run_in_background(task, 1, key='value')
+        task.assert_called_once_with(1, key='value')
+
+    @override_settings(BACKGROUND_TASKS_EAGER=False)
+    def test_task_waits_for_commit(self):
+        task = mock.Mock()
+        run_in_background(task)
+        task.assert_not_called()
+
+
+class HashedStorageTestClass(TransactionTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = HashedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('posts/a.JPG', ContentFile(b'image'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'image'))
+        other = self.storage.save('posts/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/'
+                                r'[0-9a-f]{64}\.jpg$')
+
+    def test_concurrent_identical_uploads_share_file(self):
+        """An upload racing another one of the same content is stored
+        under the same name, without a second file.
+        """
+        first = self.storage.save('posts/a.jpg', ContentFile(b'image'))
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            second = self.storage.save('posts/b.jpg', ContentFile(b'image'))
+        self.assertEqual(second, first)
+        self.assertEqual(os.listdir(os.path.dirname(
+            self.storage.path(first))), [os.path.basename(first)])
+
+    def test_rehash_links_file_to_hashed_name(self):
+        """The file stays under its old name until the caller deletes it."""
+        os.makedirs(self.storage.path('posts'))
+        with open(self.storage.path('posts/legacy.jpg'), 'wb') as file:
+            file.write(b'image')
+        hashed, created = self.storage.rehash('posts/legacy.jpg')
+        self.assertTrue(created)
+        self.assertTrue(self.storage.exists('posts/legacy.jpg'))
+        self.assertEqual(self.storage.open(hashed).read(), b'image')
+        self.assertEqual(self.storage.rehash('posts/legacy.jpg'),
+                         (hashed, False))
+
+    def test_file_is_swept_after_last_reference(self):
+        name = self.storage.save('posts/a.jpg', ContentFile(b'image'))
+        retain([name, 'posts/legacy.jpg'])
+        retain([name])
+        release([name], self.storage)
+        release([name], self.storage)
+        self.assertEqual(StoredFile.objects.get(name=name).references, 0)
+        self.assertEqual(sweep(self.storage), 0)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(sweep(self.storage, grace_period=0), 1)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_upload_keeps_released_file(self):
+        """An upload of released content is not swept before it is
+        retained, and a swept file is written again.
+        """
+        name = self.storage.save('posts/a.jpg', ContentFile(b'image'))
+        retain([name])
+        release([name], self.storage)
+        cutoff_passed = StoredFile.objects.get(name=name).released
+        self.storage.save('posts/b.jpg', ContentFile(b'image'))
+        self.assertGreater(StoredFile.objects.get(name=name).released,
+                           cutoff_passed)
+        with mock.patch('core.storage.timezone.now',
+                        return_value=cutoff_passed):
+            self.assertEqual(sweep(self.storage, grace_period=0), 0)
+        retain([name])
+        self.assertEqual(sweep(self.storage, grace_period=0), 0)
+        self.assertTrue(self.storage.exists(name))
+        release([name], self.storage)
+        sweep(self.storage, grace_period=0)
+        self.assertEqual(
+            self.storage.save('posts/c.jpg', ContentFile(b'image')), name)
+        self.assertTrue(self.storage.exists(name))
+
+
+class MediaServingTestClass(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.name = HashedStorage().save('posts/a.txt',
+                                         ContentFile(b'0123456789'))
+        self.url = f'/media/{self.name}'
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_file_is_served_with_cache_headers(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_byte_ranges(self):
+        ranges = {
+            'bytes=2-4': (b'234', 'bytes 2-4/10'),
+            'bytes=7-': (b'789', 'bytes 7-9/10'),
+            'bytes=-2': (b'89', 'bytes 8-9/10'),
+            'bytes=8-100': (b'89', 'bytes 8-9/10'),
+        }
+        for header, (content, content_range) in ranges.items():
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.PARTIAL_CONTENT)
+                self.assertEqual(b''.join(response.streaming_content),
+                                 content)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'],
+                                 str(len(content)))
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code,
+                         HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4',
+                                   HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_paths_outside_media_are_not_served(self):
+        for path in ('../settings.py', 'posts/.hidden', 'posts/'):
+            with self.subTest(path=path):
+                response = self.client.get(f'/media/{path}')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_delivery_is_handed_to_front_server(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
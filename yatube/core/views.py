@@ -1,4 +1,15 @@
+import mimetypes
+import os
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+from .media import cache_headers, file_response, sendfile_response
 
 
 def page_not_found(request, exception):
@@ -11,3 +22,28 @@ def internal_server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@require_safe
+def serve_media(request, path):
+    """Serves a file of MEDIA_ROOT. For all users."""
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat_result = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE:
+        response = sendfile_response(path, full_path, content_type)
+    else:
+        response = file_response(
+            request, full_path, stat_result, content_type)
+    if response.status_code == 416:
+        return response
+    return cache_headers(response, path, stat_result.st_mtime,
+                         settings.MEDIA_CACHE_MAX_AGE)
@@ -0,0 +1,73 @@
+"""Rendering of post articles in one pass.
+
+The article template is looked up once per page, the view name is read
+once and every URL pattern of the article links is reversed once per
+request; the URL of each post is then filled in with its argument.
+"""
+from urllib.parse import quote
+
+from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+ARTICLE_TEMPLATE = 'posts/includes/article.html'
+# Characters reverse() leaves unquoted in URL arguments
+SAFE_CHARACTERS = RFC3986_SUBDELIMS + '/~:@'
+
+
+class UrlPattern:
+    """URL of a pattern reversed once with a marker for its argument."""
+
+    def __init__(self, name, argument, marker):
+        url = reverse(name, kwargs={argument: marker})
+        self.prefix, _, self.suffix = url.partition(str(marker))
+
+    def format(self, value):
+        quoted = quote(str(value), SAFE_CHARACTERS)
+        return f'{self.prefix}{quoted}{self.suffix}'
+
+
+class ArticleLinks:
+    """Reversed URL patterns of the links of an article."""
+
+    def __init__(self):
+        self.group = UrlPattern('posts:group_list', 'slug', 'group-slug')
+        self.profile = UrlPattern('posts:profile', 'username', 'username')
+        self.detail = UrlPattern('posts:post_detail', 'post_id', 987654321)
+
+    def of(self, post):
+        """Return the link URLs of the post."""
+        links = {'profile': self.profile.format(post.author.username),
+                 'detail': self.detail.format(post.pk)}
+        if post.group_id:
+            links['group'] = self.group.format(post.group.slug)
+        return links
+
+
+def get_article_links(request):
+    """Return the ArticleLinks of the request, reversed on first use."""
+    if not hasattr(request, '_article_links'):
+        request._article_links = ArticleLinks()
+    return request._article_links
+
+
+def render_articles(context, posts, numbered=True):
+    """Yield the rendered article of every post, counted in forloop as
+    in a {% for %} loop if numbered.
+    """
+    template = context.template.engine.get_template(ARTICLE_TEMPLATE)
+    request = context['request']
+    links = get_article_links(request)
+    view_name = getattr(request.resolver_match, 'view_name', None)
+    with context.push(view_name=view_name):
+        for number, post in enumerate(posts, 1):
+            values = {'post': post, 'links': links.of(post)}
+            if numbered:
+                values['forloop'] = {'counter': number, 'first': number == 1}
+            with context.push(values):
+                yield template.render(context)
+
+
+def stream_articles(context, posts):
+    """Yield the article elements of the posts for core.streaming."""
+    for article in render_articles(context, posts):
+        yield f'<article>{article}</article>'
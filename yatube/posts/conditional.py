@@ -0,0 +1,87 @@
+"""Validators of conditional GET requests to the posts pages.
+
+The validators are read from the feed generations and stored
+timestamps, so a matching request is answered with 304 Not Modified
+before the page is queried or rendered. ETags are weak: streamed and
+rendered responses of the same page differ byte by byte.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from core.cache import get_generation
+
+from . import feed_cache, follows, lookups
+from .models import Comment, Post
+
+
+def make_etag(request, *parts):
+    """Return a weak ETag of the parts as seen by the request's user.
+
+    Pages of users embed the CSRF token of their forms, so their ETags
+    change with the CSRF cookie, which is rotated on login.
+    """
+    user = request.user
+    if user.is_authenticated:
+        parts = (request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),) + parts
+    parts = (user.get_username(),) + parts
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def index_etag(request):
+    return make_etag(request, get_generation(feed_cache.INDEX_SCOPE))
+
+
+def group_etag(request, slug):
+    group = lookups.get_group(slug)
+    if group is None:
+        return None
+    return make_etag(
+        request, get_generation(feed_cache.group_scope(group.pk)))
+
+
+def profile_etag(request, username):
+    author = lookups.get_user(username)
+    if author is None:
+        return None
+    following = follows.is_following(request.user, author)
+    generation = get_generation(feed_cache.author_scope(author.pk))
+    return make_etag(
+        request, feed_cache.profile_generation(author.pk, generation),
+        following)
+
+
+def _post_state(request, post_id):
+    """Return the edit time, comment state and scopes of the post.
+
+    The state is read once per request for both validators.
+    """
+    if not hasattr(request, '_post_state'):
+        newest_comment = Comment.objects.filter(
+            post=OuterRef('pk')).order_by('-created').values('created')[:1]
+        request._post_state = Post.objects.filter(pk=post_id).annotate(
+            newest_comment=Subquery(newest_comment)
+        ).values('updated', 'comments_count', 'newest_comment',
+                 'author', 'group').first()
+    return request._post_state
+
+
+def post_etag(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    scopes = [feed_cache.author_scope(state['author'])]
+    if state['group']:
+        scopes.append(feed_cache.group_scope(state['group']))
+    return make_etag(
+        request, state['updated'], state['comments_count'],
+        state['newest_comment'], *map(get_generation, scopes))
+
+
+def post_last_modified(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    return max(filter(None, (state['updated'], state['newest_comment'])))
@@ -0,0 +1,79 @@
+"""Stored counters of posts, comments and follows.
+
+Counters are changed with F() expressions when objects are created,
+edited or deleted, so reading them is an attribute access. The
+recount_counters management command repairs drift with recount().
+"""
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import lookups
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _add(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_posts(posts, delta):
+    """Add delta to the counters of the posts' groups and authors."""
+    for field, model in (('group_id', Group), ('author_id', UserStats)):
+        amounts = Counter(getattr(post, field) for post in posts)
+        amounts.pop(None, None)
+        for pk, amount in amounts.items():
+            _add(model.objects.filter(pk=pk), 'posts_count', delta * amount)
+    lookups.forget_groups({post.group_id for post in posts} - {None})
+    lookups.forget_users({post.author_id for post in posts})
+
+
+def move_post(old_group_id, new_group_id):
+    """Move a post between the counters of two groups."""
+    if old_group_id != new_group_id:
+        _add(Group.objects.filter(pk=old_group_id), 'posts_count', -1)
+        _add(Group.objects.filter(pk=new_group_id), 'posts_count', 1)
+        lookups.forget_groups({old_group_id, new_group_id} - {None})
+
+
+def count_comment(comment, delta):
+    """Add delta to the comments counter of the comment's post."""
+    _add(Post.objects.filter(pk=comment.post_id), 'comments_count', delta)
+
+
+def count_follow(follow, delta):
+    """Add delta to the follow counters of both users."""
+    _add(UserStats.objects.filter(pk=follow.user_id),
+         'following_count', delta)
+    _add(UserStats.objects.filter(pk=follow.author_id),
+         'followers_count', delta)
+    lookups.forget_users([follow.user_id, follow.author_id])
+
+
+def _count(model, field):
+    """Return a subquery counting rows of the model per outer pk."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def recount():
+    """Recompute every stored counter from the source tables."""
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True).values_list('pk', flat=True).iterator()],
+        batch_size=500,
+    )
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
+    UserStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+    lookups.forget_groups(Group.objects.values('pk'))
+    lookups.forget_users(User.objects.values('pk'))
@@ -0,0 +1,133 @@
+"""Generation scopes, cache keys and surrogate keys of the feed pages.
+
+Articles show the name of the author and the title and post counter of
+the group, so an author's edit bumps the scopes of the author's groups
+too, and profile fragments are cached for the generations of the
+author's groups as well as the author's own, see profile_generation().
+"""
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import bump_generation, get_generation, get_generations
+from core.page_cache import purge
+
+from .models import Group, Post
+
+INDEX_SCOPE = 'posts:index'
+# Surrogate keys of the cached pages, see core.page_cache. Names are
+# quoted to keep the keys ASCII without spaces.
+INDEX_PAGE_KEY = 'index'
+
+
+def post_page_key(post_id):
+    return f'post-{post_id}'
+
+
+def group_page_key(slug):
+    return f'group-{quote(slug)}'
+
+
+def author_page_key(username):
+    return f'author-{quote(username)}'
+
+
+def post_keys(post):
+    """Return the surrogate keys of the post, its author and its group,
+    which are all shown in the article of the post.
+    """
+    keys = [post_page_key(post.pk), author_page_key(post.author.username)]
+    if post.group_id:
+        keys.append(group_page_key(post.group.slug))
+    return keys
+
+
+def group_scope(group_id):
+    return f'posts:group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'posts:author:{author_id}'
+
+
+def count_key(scope, generation):
+    return f'posts:count:{scope}:{generation}'
+
+
+def follow_count_key(user_id):
+    return f'posts:follow_count:{user_id}'
+
+
+def author_group_ids(author_id, generation):
+    """Return the ids of the groups the author posted to.
+
+    The ids are cached for the generation of the author's scope, which
+    every new, moved or deleted post of the author bumps.
+    """
+    key = f'posts:author_groups:{author_id}:{generation}'
+    group_ids = cache.get(key)
+    if group_ids is None:
+        group_ids = sorted(Post.objects.filter(
+            author=author_id, group__isnull=False,
+        ).order_by().values_list('group', flat=True).distinct())
+        cache.set(key, group_ids, settings.FEED_CACHE_TIMEOUT)
+    return group_ids
+
+
+def profile_generation(author_id, generation):
+    """Return the generation of the profile fragments of the author: the
+    generation of the author's scope and of the scopes of the groups
+    shown, which new posts of other authors and group edits bump.
+    """
+    scopes = [group_scope(group_id)
+              for group_id in author_group_ids(author_id, generation)]
+    generations = get_generations(scopes)
+    return '.'.join(map(str, [
+        generation, *(generations[scope] for scope in scopes)]))
+
+
+def invalidate_follow_counts(user_ids):
+    """Drop the cached follow feed counts of the users."""
+    cache.delete_many([follow_count_key(user_id) for user_id in user_ids])
+
+
+def invalidate_group(group):
+    """Invalidate the feeds showing the group title."""
+    bump_generation(INDEX_SCOPE, group_scope(group.pk))
+
+
+def invalidate_author(author):
+    """Invalidate the feeds showing the author name: the index, the
+    profile and the feeds of the groups the author posted to.
+    """
+    scope = author_scope(author.pk)
+    group_ids = author_group_ids(author.pk, get_generation(scope))
+    bump_generation(INDEX_SCOPE, scope, *map(group_scope, group_ids))
+
+
+def invalidate_posts(posts, group_ids=()):
+    """Invalidate the feeds showing the posts."""
+    scopes = {INDEX_SCOPE}
+    scopes.update(author_scope(post.author_id) for post in posts)
+    scopes.update(group_scope(group_id) for group_id in group_ids
+                  if group_id)
+    scopes.update(group_scope(post.group_id) for post in posts
+                  if post.group_id)
+    bump_generation(*scopes)
+
+
+def purge_post_pages(post, group_ids=()):
+    """Purge the cached pages showing the post and the feeds of the
+    groups, paginated anew when the post moves between them.
+    """
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True) if group_ids else ()
+    purge(post_page_key(post.pk), *map(group_page_key, slugs))
+
+
+def purge_feed_pages(*posts):
+    """Purge the cached pages of the feeds new or deleted posts are
+    paginated into.
+    """
+    purge(INDEX_PAGE_KEY, *{key for post in posts for key in post_keys(post)})
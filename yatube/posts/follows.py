@@ -0,0 +1,47 @@
+"""Cached sets of the authors followed by users.
+
+The ids of the authors a user follows are cached as a compact array of
+integers and read into a set once per request, so "am I following"
+checks run no queries. Following or unfollowing drops the array, and
+the next check loads it again with one query.
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+
+def following_key(user_id):
+    return f'posts:following:{user_id}'
+
+
+def get_following(user):
+    """Return the set of ids of the authors the user follows."""
+    if not user.is_authenticated:
+        return frozenset()
+    # The set is kept on the user object for the rest of the request.
+    # SQLite row ids, and so AutoField values, are 64-bit.
+    if not hasattr(user, '_following_ids'):
+        data = cache.get(following_key(user.pk))
+        if data is None:
+            ids = array('q', sorted(Follow.objects.filter(
+                user=user).values_list('author', flat=True)))
+            data = ids.tobytes()
+            cache.set(following_key(user.pk), data,
+                      settings.FOLLOWING_CACHE_TIMEOUT)
+        ids = array('q')
+        ids.frombytes(data)
+        user._following_ids = frozenset(ids)
+    return user._following_ids
+
+
+def is_following(user, author):
+    """Return True if the user follows the author."""
+    return getattr(author, 'pk', author) in get_following(user)
+
+
+def forget_following(user_id):
+    """Drop the cached set of the user."""
+    cache.delete(following_key(user_id))
@@ -1,5 +1,6 @@
 from django import forms
 
+from .images import EMPTY_DESCRIPTION, ImageTooLarge, normalize_image
 from .models import Comment, Group, Post
 
 
@@ -24,6 +25,20 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Поле обязательно к заполнению!')
         return text
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if 'image' not in self.changed_data:
+            return image
+        description = EMPTY_DESCRIPTION
+        if image:
+            try:
+                image, description = normalize_image(image)
+            except ImageTooLarge:
+                raise forms.ValidationError('Изображение слишком большое!')
+        for field, value in description.items():
+            setattr(self.instance, field, value)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     text = forms.CharField(widget=forms.Textarea,
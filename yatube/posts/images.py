@@ -0,0 +1,138 @@
+"""Processing of uploaded post images.
+
+Uploads are checked against IMAGE_MAX_PIXELS before they are decoded,
+bounded to IMAGE_MAX_SIDE and saved again without EXIF. Variants of the
+article crop are made in every width of IMAGE_VARIANT_WIDTHS as JPEG
+and, where Pillow supports it, WebP. The size, dominant color and a
+tiny placeholder of the image are stored on the post, so pages lay
+images out without reading them.
+"""
+import base64
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+ARTICLE_WIDTH = 960
+ARTICLE_HEIGHT = 339
+VARIANTS_DIR = 'posts/variants'
+KEPT_FORMATS = ('GIF', 'JPEG', 'PNG', 'WEBP')
+SAVE_OPTIONS = {
+    'GIF': {},
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+PLACEHOLDER_WIDTH = 16
+EMPTY_DESCRIPTION = {'image_width': None, 'image_height': None,
+                     'image_color': '', 'image_placeholder': ''}
+EXTENSIONS = {'GIF': 'gif', 'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+class ImageTooLarge(ValueError):
+    """The image has more pixels than IMAGE_MAX_PIXELS."""
+
+
+def variant_formats():
+    """Return the formats of the variants, preferred first."""
+    if features.check('webp'):
+        return ('WEBP', 'JPEG')
+    return ('JPEG',)
+
+
+def open_image(file):
+    """Open the image, refusing decompression bombs before decoding."""
+    file.seek(0)
+    image = Image.open(file)
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ImageTooLarge(f'{width}x{height}')
+    return image
+
+
+def _encode(image, image_format):
+    """Return the image encoded without EXIF."""
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    # PNG would copy the decoded EXIF unless an empty one is given.
+    image.save(buffer, image_format, exif=b'', **SAVE_OPTIONS[image_format])
+    return buffer.getvalue()
+
+
+def describe_image(image):
+    """Return the size, dominant color and placeholder of the image as
+    values of the Post fields.
+
+    The placeholder is a data URI of a tiny JPEG of the article crop.
+    """
+    small = image.convert('RGB')
+    small.thumbnail((PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+    placeholder = ImageOps.fit(
+        small, (PLACEHOLDER_WIDTH,
+                round(PLACEHOLDER_WIDTH * ARTICLE_HEIGHT / ARTICLE_WIDTH)))
+    palette_image = small.quantize(colors=4)
+    _, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3:index * 3 + 3]
+    buffer = BytesIO()
+    placeholder.save(buffer, 'JPEG', quality=40)
+    return {
+        'image_width': image.width,
+        'image_height': image.height,
+        'image_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'image_placeholder': 'data:image/jpeg;base64,'
+        + base64.b64encode(buffer.getvalue()).decode(),
+    }
+
+
+def normalize_image(file):
+    """Return the image bounded to IMAGE_MAX_SIDE and without metadata,
+    and its description.
+    """
+    max_side = settings.IMAGE_MAX_SIDE
+    image = open_image(file)
+    image_format = image.format if image.format in KEPT_FORMATS else 'PNG'
+    # JPEG is decoded at a reduced scale when it is much too large.
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    normalized = ContentFile(_encode(image, image_format),
+                             name=f'{stem}.{EXTENSIONS[image_format]}')
+    return normalized, describe_image(image)
+
+
+def save_variants(image_field):
+    """Save the variants of the image, return their metadata and the
+    description of the image.
+
+    The metadata is a list of {'width', 'height', <format>: name}
+    dicts, narrowest first.
+    """
+    with image_field.open('rb') as file:
+        image = ImageOps.exif_transpose(open_image(file))
+        image.load()
+    widths = sorted(width for width in settings.IMAGE_VARIANT_WIDTHS
+                    if width <= image.width) or [
+        min(settings.IMAGE_VARIANT_WIDTHS)]
+    largest = ImageOps.fit(
+        image, (widths[-1], round(widths[-1] * ARTICLE_HEIGHT
+                                  / ARTICLE_WIDTH)),
+        Image.LANCZOS)
+    stem = os.path.splitext(os.path.basename(image_field.name))[0]
+    variants = []
+    for width in widths:
+        height = round(width * ARTICLE_HEIGHT / ARTICLE_WIDTH)
+        resized = largest if width == widths[-1] else largest.resize(
+            (width, height), Image.LANCZOS)
+        variant = {'width': width, 'height': height}
+        for image_format in variant_formats():
+            name = f'{VARIANTS_DIR}/{stem}-{width}.{EXTENSIONS[image_format]}'
+            variant[image_format.lower()] = image_field.storage.save(
+                name, ContentFile(_encode(resized, image_format)))
+        variants.append(variant)
+    return variants, describe_image(image)
@@ -0,0 +1,103 @@
+"""Read-through cache of the groups and users named in URLs.
+
+Groups by slug and users by username are read from the cache, and so
+are the names that match nothing, so requests probing missing pages do
+not reach the database either. Entries are dropped when the object is
+saved or deleted. Users are cached with their counters, which are
+dropped with the user when the counters change; the counters of a
+cached group are only used for estimates and may lag behind.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import Group, User
+
+LOOKUP_FIELDS = {Group: 'slug', User: 'username'}
+# The password hash of a user is not copied to the cache.
+DEFERRED_FIELDS = {User: ('password',)}
+# Profiles show the counters of the user.
+RELATED_FIELDS = {User: ('stats',)}
+NOT_CACHED = object()
+
+
+def _key(model, value):
+    # Names from URLs may hold characters memcached does not accept.
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return f'posts:lookup:{model._meta.model_name}:{digest}'
+
+
+def _get(model, value):
+    key = _key(model, value)
+    instance = cache.get(key, NOT_CACHED)
+    if instance is NOT_CACHED:
+        instance = model.objects.filter(
+            **{LOOKUP_FIELDS[model]: value}).select_related(
+                *RELATED_FIELDS.get(model, ())).defer(
+                    *DEFERRED_FIELDS.get(model, ())).first()
+        cache.set(key, instance, settings.LOOKUP_CACHE_TIMEOUT
+                  if instance else settings.LOOKUP_CACHE_MISSING_TIMEOUT)
+    return instance
+
+
+def _get_or_404(model, value):
+    instance = _get(model, value)
+    if instance is None:
+        raise Http404(f'No {model._meta.object_name} matches the query.')
+    return instance
+
+
+def get_group(slug):
+    """Return the group with the slug or None."""
+    return _get(Group, slug)
+
+
+def get_group_or_404(slug):
+    return _get_or_404(Group, slug)
+
+
+def get_user(username):
+    """Return the user with the username or None."""
+    return _get(User, username)
+
+
+def get_user_or_404(username):
+    return _get_or_404(User, username)
+
+
+def saved_value(instance):
+    """Return the stored value of the lookup field of the instance."""
+    model = type(instance)
+    return model.objects.filter(pk=instance.pk).values_list(
+        LOOKUP_FIELDS[model], flat=True).first()
+
+
+def forget(instance, *values):
+    """Drop the cached lookups of the instance and of the values its
+    lookup field had before.
+    """
+    model = type(instance)
+    values = {getattr(instance, LOOKUP_FIELDS[model]), *values} - {None}
+    cache.delete_many([_key(model, value) for value in values])
+
+
+def _forget_pks(model, pks):
+    values = model.objects.filter(pk__in=pks).values_list(
+        LOOKUP_FIELDS[model], flat=True)
+    cache.delete_many([_key(model, value) for value in values])
+
+
+def forget_groups(group_ids):
+    """Drop the cached lookups of the groups, e.g. when their counters
+    change.
+    """
+    _forget_pks(Group, group_ids)
+
+
+def forget_users(user_ids):
+    """Drop the cached lookups of the users, e.g. when their counters
+    change.
+    """
+    _forget_pks(User, user_ids)
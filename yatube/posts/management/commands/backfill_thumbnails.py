@@ -0,0 +1,113 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.feed_cache import invalidate_posts
+from posts.models import Post
+from posts.thumbnails import make_thumbnails
+
+
+def _init_worker():
+    django.setup()
+    # Thumbnails give way to the web workers on the same host.
+    os.nice(10)
+
+
+def _make_thumbnails(post_id):
+    try:
+        make_thumbnails(post_id, invalidate=False)
+    except Exception as error:
+        return post_id, f'{type(error).__name__}: {error}'
+    return post_id, None
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as file:
+            return int(file.read())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_checkpoint(path, post_id):
+    with open(f'{path}.tmp', 'w') as file:
+        file.write(str(post_id))
+    os.replace(f'{path}.tmp', path)
+
+
+class Command(BaseCommand):
+    help = ('Make the image variants of every post with an image in a '
+            'process pool, resuming after the last checkpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Worker processes; 0 makes the variants in this process.')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(tempfile.gettempdir(),
+                                 'yatube-backfill_thumbnails.checkpoint'),
+            help='File with the id of the last processed post, in the '
+                 'temporary directory by default.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore the checkpoint and start from the first post.')
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Only process posts without variants.')
+
+    def _process(self, run, batch):
+        """Make the variants of a batch of posts, return the errors count."""
+        made = []
+        for post_id, error in run(_make_thumbnails, batch):
+            if error:
+                self.stderr.write(f'Post {post_id}: {error}')
+            else:
+                made.append(post_id)
+        if made:
+            invalidate_posts(list(Post.objects.filter(
+                pk__in=made).only('author', 'group')))
+        return len(batch) - len(made)
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        posts = Post.objects.exclude(image='').order_by('pk')
+        if options['missing']:
+            posts = posts.filter(image_variants='')
+        last_id = 0 if options['restart'] else _read_checkpoint(checkpoint)
+        if last_id:
+            self.stdout.write(f'Resuming after post {last_id}')
+        pool = None
+        if options['processes']:
+            # Workers open their own connections instead of sharing ours.
+            connections.close_all()
+            pool = ProcessPoolExecutor(options['processes'],
+                                       initializer=_init_worker)
+        done = errors = 0
+        start = time.monotonic()
+        try:
+            while True:
+                batch = list(posts.filter(pk__gt=last_id).values_list(
+                    'pk', flat=True)[:options['batch_size']])
+                if not batch:
+                    break
+                errors += self._process(pool.map if pool else map, batch)
+                done += len(batch)
+                last_id = batch[-1]
+                _write_checkpoint(checkpoint, last_id)
+                rate = done / (time.monotonic() - start)
+                self.stdout.write(
+                    f'{done} posts, {rate:.1f} posts/s, {errors} errors')
+        finally:
+            if pool:
+                pool.shutdown()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Thumbnails made for {done - errors} posts, {errors} errors'))
@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import StoredFile
+from core.storage import is_hashed, retain
+from posts.feed_cache import invalidate_posts
+from posts.models import Post
+
+
+def _rename(post, names):
+    """Store the new file names of the post, return False if the post
+    was edited meanwhile.
+    """
+    variants = [{key: names.get(value, value)
+                 for key, value in variant.items()}
+                for variant in post.variants]
+    with transaction.atomic():
+        renamed = Post.objects.filter(
+            pk=post.pk, image=post.image.name).update(
+                image=names.get(post.image.name, post.image.name),
+                thumbnail=names.get(post.thumbnail, post.thumbnail),
+                image_variants=json.dumps(variants) if variants else '')
+        if renamed:
+            retain(names.values())
+    return bool(renamed)
+
+
+class Command(BaseCommand):
+    help = ('Move the post images and variants stored under upload names '
+            'to content-addressed names.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        storage = Post.image.field.storage
+        posts = Post.objects.exclude(image='').order_by('pk').only(
+            'image', 'image_variants', 'thumbnail', 'author', 'group')
+        last_id = moved = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            renamed = []
+            for post in batch:
+                # Files are linked to the hashed names first, so the post
+                # shows its image until its row refers to the new names.
+                links = {name: storage.rehash(name)
+                         for name in post.media_names
+                         if not is_hashed(name) and storage.exists(name)}
+                names = {name: hashed for name, (hashed, _) in links.items()}
+                if names and _rename(post, names):
+                    renamed.append(post)
+                    moved += len(names)
+                    for name in names:
+                        storage.delete(name)
+                    continue
+                # The post was edited meanwhile: the new links are left to
+                # the sweeper unless something refers to them.
+                for hashed, created in links.values():
+                    if created:
+                        StoredFile.objects.get_or_create(
+                            name=hashed,
+                            defaults={'released': timezone.now()})
+            if renamed:
+                invalidate_posts(renamed)
+            last_id = batch[-1].pk
+            self.stdout.write(f'{last_id}: {moved} files moved')
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} files moved, {StoredFile.objects.count()} '
+            f'files stored'))
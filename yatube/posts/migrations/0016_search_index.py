@@ -0,0 +1,23 @@
+from django.db import migrations
+
+TABLES = (('posts_post_search', 'posts_post'),
+          ('posts_comment_search', 'posts_comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_description'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [f"CREATE VIRTUAL TABLE {search_table} USING fts5(text, "
+             "tokenize = 'unicode61 remove_diacritics 2')"
+             for search_table, table in TABLES]
+            + [f'INSERT INTO {search_table} (rowid, text) '
+               f'SELECT id, text FROM {table}'
+               for search_table, table in TABLES],
+            [f'DROP TABLE {search_table}' for search_table, table in TABLES],
+        ),
+    ]
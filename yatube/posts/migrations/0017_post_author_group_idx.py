@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'group'], name='post_author_group_idx'),
+        ),
+    ]
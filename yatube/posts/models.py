@@ -1,13 +1,56 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Fetch authors with their counters and groups with the posts."""
+        return self.select_related('author__stats', 'group')
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Create posts as save() does: update counters, file references,
+        cached feeds and pages and the search index and deliver the posts
+        to the follow feeds.
+
+        bulk_create() does not send post_save and does not set primary
+        keys on SQLite, so the new posts are read back by the primary keys
+        after the largest one before the insert.
+        """
+        from core.storage import retain
+
+        from .counters import count_posts
+        from .feed_cache import invalidate_posts, purge_feed_pages
+        from .search import index
+        from .timeline import fan_out
+
+        with transaction.atomic(using=self.db):
+            last_pk = self.model.objects.using(self.db).aggregate(
+                last_pk=models.Max('pk'))['last_pk'] or 0
+            objs = super().bulk_create(objs, *args, **kwargs)
+            created = list(self.model.objects.using(self.db).filter(
+                pk__gt=last_pk,
+                author__in={post.author_id for post in objs},
+            ).select_related('author', 'group'))
+        if objs:
+            count_posts(objs, 1)
+            retain([name for post in objs for name in post.media_names])
+            invalidate_posts(objs)
+            purge_feed_pages(*created)
+            index(self.model, created)
+            fan_out(created)
+        return objs
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -25,15 +68,86 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    thumbnail = models.CharField(
+        max_length=255, blank=True, default='', editable=False)
+    image_variants = models.TextField(blank=True, default='', editable=False)
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_color = models.CharField(
+        max_length=7, blank=True, default='', editable=False)
+    image_placeholder = models.TextField(
+        blank=True, default='', editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # Ascending indexes are scanned backwards for the newest first
+        # (date DESC, id DESC) order of feeds and cursor pages.
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+            # The distinct groups of an author, see feed_cache.
+            models.Index(fields=['author', 'group'],
+                         name='post_author_group_idx'),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def get_absolute_url(self):
         return reverse('posts:post_detail', kwargs={'post_id': self.pk})
 
+    @property
+    def thumbnail_url(self):
+        """URL of the stored thumbnail, or of the image until it is made."""
+        if self.thumbnail:
+            return self.image.storage.url(self.thumbnail)
+        return self.image.url if self.image else ''
+
+    @property
+    def variants(self):
+        """Metadata of the image variants, narrowest first."""
+        return json.loads(self.image_variants) if self.image_variants else []
+
+    @property
+    def media_names(self):
+        """Names of the stored files of the image and its variants."""
+        names = {self.image.name} if self.image else set()
+        names.update(variant[key] for variant in self.variants
+                     for key in variant if key not in ('width', 'height'))
+        return names
+
+    @property
+    def display_size(self):
+        """Width and height of the image shown in the article, if known."""
+        for variant in self.variants:
+            if variant['jpeg'] == self.thumbnail:
+                return variant['width'], variant['height']
+        if self.image_width and self.image_height:
+            return self.image_width, self.image_height
+        return None
+
+    @cached_property
+    def image_srcset(self):
+        """srcset attributes of the image variants by format."""
+        variants = self.variants
+        if not variants:
+            return {}
+        return {
+            image_format: ', '.join(
+                f'{self.image.storage.url(variant[image_format])} '
+                f'{variant["width"]}w'
+                for variant in variants)
+            for image_format in variants[0] if image_format not in (
+                'width', 'height')
+        }
+
     def __str__(self) -> str:
         return self.text[:15]
 
@@ -42,6 +156,7 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -50,7 +165,7 @@ class Group(models.Model):
         return reverse('posts:group_list', kwargs={'slug': self.slug})
 
     def get_posts_count(self):
-        return Post.objects.filter(group=self.pk).count()
+        return self.posts_count
 
 
 class Comment(models.Model):
@@ -69,6 +184,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        # Scanned backwards for the newest first (created, id) order.
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -99,3 +219,60 @@ class Follow(models.Model):
 
     def __str__(self) -> str:
         return (f'{self.user.username} подписан на {self.author.username}')
+
+
+class UserStats(models.Model):
+    """Stored post and follow counters of a user."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self) -> str:
+        return (f'Счётчики {self.user.username}')
+
+
+class TimelineEntry(models.Model):
+    """Post delivered to the follow feed of a user."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='timeline_entry_unique')]
+        indexes = [
+            # Scanned backwards for the newest first follow feed.
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=['user', 'author', 'pub_date'],
+                         name='timeline_user_author_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self) -> str:
+        return (f'Пост {self.post_id} в ленте {self.user_id}')
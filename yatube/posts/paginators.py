@@ -0,0 +1,170 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.functional import cached_property
+
+from core.stampede import get_or_compute
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(date, pk):
+    """Return an opaque cursor token for the (date, id) of an object."""
+    microseconds = (date - EPOCH) // timedelta(microseconds=1)
+    raw = f'{microseconds}:{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (date, id) from a cursor token or None if it is invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        microseconds, pk = raw.decode().split(':')
+        date = EPOCH + timedelta(microseconds=int(microseconds))
+        return date, int(pk)
+    except (ValueError, TypeError, OverflowError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage(Page):
+    """A page of objects addressed by cursors instead of a page number."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<KeysetPage>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.cursor_for(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.cursor_for(self.object_list[0])
+        return None
+
+
+def _keyset_field(queryset, field, alias):
+    """Annotate a field of a joined table under the alias, so the filters
+    and the order reuse the join of the queryset and cursors read it.
+    """
+    if LOOKUP_SEP not in field:
+        return queryset, field
+    return queryset.annotate(**{alias: F(field)}), alias
+
+
+class KeysetPaginator(Paginator):
+    """Paginate newest first by (date_field, id_field) without COUNT and
+    OFFSET queries.
+
+    The cost of a page does not depend on how deep it is, and pages
+    are stable when new objects are added. The fields may be columns of
+    a joined table whose index gives the order, e.g.
+    'timeline_entries__pub_date'; they are annotated on the objects.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 id_field='pk'):
+        object_list, self.date_field = _keyset_field(
+            object_list, date_field, 'keyset_date')
+        object_list, self.id_field = _keyset_field(
+            object_list, id_field, 'keyset_id')
+        super().__init__(object_list.order_by(
+            f'-{self.date_field}', f'-{self.id_field}'), per_page)
+
+    def cursor_for(self, obj):
+        return encode_cursor(getattr(obj, self.date_field),
+                             getattr(obj, self.id_field))
+
+    def _beyond(self, key, lookup):
+        date, pk = key
+        return (Q(**{f'{self.date_field}__{lookup}': date})
+                | Q(**{self.date_field: date,
+                       f'{self.id_field}__{lookup}': pk}))
+
+    def get_cursor_page(self, after=None, before=None):
+        """Return the page after or before the cursor, the first page
+        if the cursor is missing or invalid.
+        """
+        before_key = before and decode_cursor(before)
+        if before_key:
+            objects = list(self.object_list.filter(
+                self._beyond(before_key, 'gt')
+            ).order_by(self.date_field, self.id_field)[:self.per_page + 1])
+            if len(objects) <= self.per_page:
+                return self.get_cursor_page()
+            return KeysetPage(
+                objects[:self.per_page][::-1], self, True, True)
+        after_key = after and decode_cursor(after)
+        objects = self.object_list
+        if after_key:
+            objects = objects.filter(self._beyond(after_key, 'lt'))
+        objects = list(objects[:self.per_page + 1])
+        has_next = len(objects) > self.per_page
+        return KeysetPage(
+            objects[:self.per_page], self, has_next, bool(after_key))
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator that caches the count and may estimate it.
+
+    The count is stored in the cache under count_key and recomputed
+    once when it expires (see core.stampede); writes invalidate it by
+    changing or deleting the key. The stored_count callable returns an
+    exact stored counter used instead of COUNT(*). If the estimate
+    callable returns more than PAGINATOR_ESTIMATE_ABOVE, the estimate
+    is used instead of COUNT(*) and count_is_exact is False.
+    """
+    page_window_size = 5
+
+    def __init__(self, object_list, per_page, count_key=None, estimate=None,
+                 stored_count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.estimate = estimate
+        self.stored_count = stored_count
+        self.count_is_exact = True
+
+    def _compute_count(self):
+        if self.stored_count is not None:
+            return self.stored_count(), True
+        if self.estimate is not None:
+            estimate = self.estimate()
+            if estimate > settings.PAGINATOR_ESTIMATE_ABOVE:
+                return estimate, False
+        return self.object_list.count(), True
+
+    @cached_property
+    def count(self):
+        if self.count_key:
+            count, self.count_is_exact = get_or_compute(
+                self.count_key, self._compute_count,
+                settings.FEED_CACHE_TIMEOUT)
+        else:
+            count, self.count_is_exact = self._compute_count()
+        return count
+
+    def get_page(self, number):
+        """Return a page with page_window, the page numbers around it."""
+        page = super().get_page(number)
+        first = max(page.number - self.page_window_size, 1)
+        last = min(page.number + self.page_window_size, self.num_pages)
+        page.page_window = range(first, last + 1)
+        return page
@@ -0,0 +1,152 @@
+"""Full-text search over the texts of posts and comments.
+
+The texts are copied to SQLite FTS5 tables whose rowid is the id of the
+post or comment. Saves and deletes update the copies (see signals), and
+the rebuild_search_index command refills them. Queries match whole
+words through the index and rank the matches by bm25 instead of
+scanning every text with LIKE '%term%'.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+
+SEARCH_TABLES = {Post: 'posts_post_search', Comment: 'posts_comment_search'}
+WORD = re.compile(r'\w+')
+# Words of a query after the first ones are ignored.
+MAX_TERMS = 10
+# Snippets mark the matches with control characters, which are replaced
+# by tags after the snippet is escaped.
+MATCH_START, MATCH_END = '\x02', '\x03'
+SNIPPET_TOKENS = 32
+
+SearchHit = namedtuple('SearchHit', 'post comment snippet')
+
+
+def build_query(text):
+    """Return an FTS5 query matching all words of the text, or ''.
+
+    Every word is quoted, so the operators and syntax of FTS5 queries
+    cannot be used and cannot fail.
+    """
+    return ' '.join(f'"{word}"' for word in WORD.findall(text)[:MAX_TERMS])
+
+
+def highlight(snippet):
+    """Return the escaped snippet with the matches wrapped in <mark>."""
+    return mark_safe(escape(snippet).replace(
+        MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def index(model, objects):
+    """Store the texts of the posts or comments in the search index."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLES[model]} (rowid, text) '
+            'VALUES (%s, %s)', [(obj.pk, obj.text) for obj in objects])
+
+
+def unindex(model, ids):
+    """Remove the posts or comments with the ids from the search index."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {SEARCH_TABLES[model]} WHERE rowid = %s',
+            [(pk,) for pk in ids])
+
+
+def rebuild():
+    """Refill the search index from the posts and comments."""
+    with connection.cursor() as cursor:
+        for model, table in SEARCH_TABLES.items():
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, text) '
+                f'SELECT id, text FROM {model._meta.db_table}')
+            # Merge the segments of the index into one.
+            cursor.execute(
+                f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+
+def matching(queryset, text):
+    """Filter the posts or comments to the ones matching the text."""
+    query = build_query(text)
+    if not query:
+        return queryset.none()
+    table = SEARCH_TABLES[queryset.model]
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {table} WHERE {table} MATCH %s', (query,)))
+
+
+class SearchResults:
+    """Posts and comments matching a query, best matches first.
+
+    Slices run one query for the page of matches and load its posts and
+    comments, so the results are paginated by Paginator.
+    """
+
+    def __init__(self, text):
+        self.query = build_query(text)
+
+    def count(self):
+        if not self.query:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT ' + ' + '.join(
+                f'(SELECT COUNT(*) FROM {table} WHERE {table} MATCH %s)'
+                for table in SEARCH_TABLES.values()
+            ), [self.query] * len(SEARCH_TABLES))
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def _matches(self, offset, limit):
+        # Each table gives its best offset + limit matches, so bm25 and
+        # the snippets are only sorted and made for those.
+        selects = [
+            f"SELECT * FROM (SELECT '{model._meta.model_name}' AS kind, "
+            f'rowid AS id, rank, snippet({table}, 0, %s, %s, %s, %s) '
+            f'FROM {table} WHERE {table} MATCH %s ORDER BY rank LIMIT %s)'
+            for model, table in SEARCH_TABLES.items()
+        ]
+        params = [MATCH_START, MATCH_END, '…', SNIPPET_TOKENS, self.query,
+                  offset + limit] * len(SEARCH_TABLES)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                ' UNION ALL '.join(selects)
+                + ' ORDER BY rank LIMIT %s OFFSET %s',
+                params + [limit, offset])
+            return cursor.fetchall()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset, limit = index.start or 0, index.stop - (index.start or 0)
+        if not self.query or limit <= 0:
+            return []
+        matches = self._matches(offset, limit)
+        posts = Post.objects.for_feed().in_bulk(
+            [pk for kind, pk, rank, snippet in matches if kind == 'post'])
+        comments = Comment.objects.select_related(
+            'author', 'post__author').in_bulk(
+                [pk for kind, pk, rank, snippet in matches
+                 if kind == 'comment'])
+        hits = []
+        for kind, pk, rank, snippet in matches:
+            if kind == 'post' and pk in posts:
+                hits.append(SearchHit(posts[pk], None, highlight(snippet)))
+            elif kind == 'comment' and pk in comments:
+                comment = comments[pk]
+                hits.append(
+                    SearchHit(comment.post, comment, highlight(snippet)))
+        return hits
+
+
+def search(text):
+    """Return the ranked matches of the text among posts and comments."""
+    return SearchResults(text)
@@ -0,0 +1,235 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import page_cache
+from core.storage import release, retain
+
+from . import counters, feed_cache, follows, lookups, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    """Creates the counters of a new user."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, update_fields,
+                            **kwargs):
+    """Drops cached feeds showing the name of an edited user."""
+    if not created and update_fields != frozenset({'last_login'}):
+        feed_cache.invalidate_author(instance)
+
+
+@receiver(post_save, sender=User)
+def purge_author_pages(sender, instance, created, update_fields,
+                       **kwargs):
+    """Purges the cached pages showing the name of a user."""
+    if created:
+        page_cache.purge(feed_cache.author_page_key(instance.username))
+    elif update_fields != frozenset({'last_login'}):
+        page_cache.purge(feed_cache.INDEX_PAGE_KEY,
+                         feed_cache.author_page_key(instance.username))
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Group)
+def remember_lookup_value(sender, instance, update_fields, **kwargs):
+    """Keeps the stored slug or username of an edited group or user."""
+    if instance.pk and update_fields != frozenset({'last_login'}):
+        instance._saved_lookup_value = lookups.saved_value(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Group)
+def forget_lookup(sender, instance, **kwargs):
+    """Drops the cached lookups of a saved or deleted group or user."""
+    if kwargs.get('update_fields') != frozenset({'last_login'}):
+        lookups.forget(
+            instance, getattr(instance, '_saved_lookup_value', None))
+
+
+@receiver(post_save, sender=Group)
+def purge_group_pages(sender, instance, created, **kwargs):
+    """Purges the cached pages showing the title of a group."""
+    if created:
+        page_cache.purge(feed_cache.group_page_key(instance.slug))
+    else:
+        page_cache.purge(feed_cache.INDEX_PAGE_KEY,
+                         feed_cache.group_page_key(instance.slug))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, instance, created, **kwargs):
+    """Drops cached feeds showing the title of an edited group."""
+    if not created:
+        feed_cache.invalidate_group(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_post(sender, instance, **kwargs):
+    """Keeps the stored text, group and files of an edited post for the
+    search index, counters and file references.
+    """
+    if instance.pk:
+        saved = Post.objects.filter(pk=instance.pk).only(
+            'text', 'group', 'image', 'image_variants').first()
+        instance._saved_group_id = saved and saved.group_id
+        instance._saved_media = saved.media_names if saved else set()
+        instance._saved_text = saved and saved.text
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    """Updates group and author counters of a created or edited post."""
+    if created:
+        counters.count_posts([instance], 1)
+    elif hasattr(instance, '_saved_group_id'):
+        counters.move_post(instance._saved_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Updates group and author counters of a deleted post."""
+    counters.count_posts([instance], -1)
+
+
+@receiver(post_save, sender=Post)
+def reference_saved_post_media(sender, instance, **kwargs):
+    """Counts references to the new files of a post, drops the replaced."""
+    saved = getattr(instance, '_saved_media', set())
+    media = instance.media_names
+    retain(media - saved)
+    release(saved - media, Post.image.field.storage)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_post_media(sender, instance, **kwargs):
+    """Drops the references of a deleted post to its files."""
+    release(instance.media_names, Post.image.field.storage)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_feeds(sender, instance, **kwargs):
+    """Drops cached feeds showing a created or edited post."""
+    feed_cache.invalidate_posts(
+        [instance], [getattr(instance, '_saved_group_id', None)])
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    """Drops cached feeds showing a deleted post."""
+    feed_cache.invalidate_posts([instance])
+
+
+@receiver(post_save, sender=Post)
+def purge_saved_post_pages(sender, instance, created, **kwargs):
+    """Purges the cached pages showing a created or edited post."""
+    if created:
+        feed_cache.purge_feed_pages(instance)
+        return
+    saved_group_id = getattr(instance, '_saved_group_id', instance.group_id)
+    moved = ({saved_group_id, instance.group_id} - {None}
+             if saved_group_id != instance.group_id else ())
+    feed_cache.purge_post_pages(instance, moved)
+
+
+@receiver(post_delete, sender=Post)
+def purge_deleted_post_pages(sender, instance, **kwargs):
+    """Purges the cached pages showing a deleted post."""
+    feed_cache.purge_feed_pages(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    """Updates the search index with the text of a new or edited post."""
+    if getattr(instance, '_saved_text', None) != instance.text:
+        search.index(Post, [instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    """Removes a deleted post from the search index."""
+    search.unindex(Post, [instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Adds a new post to the follow feeds of the author's followers."""
+    if created:
+        timeline.fan_out([instance])
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    """Updates the comments counter of the post."""
+    if created:
+        counters.count_comment(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Updates the comments counter of the post."""
+    counters.count_comment(instance, -1)
+
+
+@receiver(post_save, sender=Comment)
+def index_saved_comment(sender, instance, **kwargs):
+    """Updates the search index with the text of a comment."""
+    search.index(Comment, [instance])
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    """Removes a deleted comment from the search index."""
+    search.unindex(Comment, [instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    """Purges the cached pages of the post of a comment."""
+    page_cache.purge(feed_cache.post_page_key(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    """Updates the follow counters of both users."""
+    if created:
+        counters.count_follow(instance, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """Updates the follow counters of both users."""
+    counters.count_follow(instance, -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_following(sender, instance, **kwargs):
+    """Drops the cached set of authors followed by the user."""
+    follows.forget_following(instance.user_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """Adds the posts of a newly followed author to the follow feed."""
+    if created:
+        timeline.backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    """Removes the posts of an unfollowed author from the follow feed."""
+    timeline.prune(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def catch_up_timelines(sender, instance, **kwargs):
+    """Pulls the posts of an author pushed again into the follow feeds."""
+    timeline.schedule_catch_up(instance.author_id)
@@ -0,0 +1,23 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.articles import render_articles
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def articles(context, posts):
+    """Render the articles of the posts in one pass and return them.
+
+        {% articles page_obj as rendered %}
+        {% for article in rendered %}...{% endfor %}
+    """
+    return [mark_safe(article) for article in render_articles(context, posts)]
+
+
+@register.simple_tag(takes_context=True)
+def article(context, post):
+    """Render the article of a single post."""
+    return mark_safe(''.join(
+        render_articles(context, [post], numbered=False)))
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import articles
+from posts.models import Group, Post, User
+
+
+class ArticlesTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Автор.name+1')
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        Post.objects.bulk_create([
+            Post(text=f'Test post {num}', author=cls.user_author,
+                 group=cls.group)
+            for num in range(5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_links_match_reversed_urls(self):
+        """Links filled in from reversed patterns equal reverse()."""
+        post = Post.objects.first()
+        self.assertEqual(articles.ArticleLinks().of(post), {
+            'profile': reverse('posts:profile', kwargs={
+                'username': post.author.username}),
+            'detail': reverse('posts:post_detail', kwargs={
+                'post_id': post.pk}),
+            'group': reverse('posts:group_list', kwargs={
+                'slug': post.group.slug}),
+        })
+
+    def test_feed_reverses_each_pattern_once(self):
+        """A feed page reverses the article links once per pattern."""
+        with mock.patch('posts.articles.reverse',
+                        side_effect=reverse) as counted:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(counted.call_count, 3)
+        self.assertEqual(response.content.decode().count('<article>'), 5)
+        self.assertContains(response, reverse(
+            'posts:profile', kwargs={'username': 'Автор.name+1'}), 5)
@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.user_reader = User.objects.create(username='Reader')
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.user_author)
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        cls.group_another = Group.objects.create(title='another group',
+                                                 slug='another_slug')
+
+    def _stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters_follow_create_edit_delete(self):
+        """Group and author counters follow post create, edit and delete."""
+        post = Post.objects.create(text='Test post',
+                                   author=CountersTestCase.user_author,
+                                   group=CountersTestCase.group)
+        CountersTestCase.group.refresh_from_db()
+        self.assertEqual(CountersTestCase.group.posts_count, 1)
+        self.assertEqual(
+            self._stats(CountersTestCase.user_author).posts_count, 1)
+        CountersTestCase.client_author.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Edited post',
+             'group': CountersTestCase.group_another.pk})
+        self.assertEqual(
+            list(Group.objects.order_by('pk').values_list(
+                'posts_count', flat=True)), [0, 1])
+        post.refresh_from_db()
+        post.delete()
+        self.assertEqual(
+            list(Group.objects.order_by('pk').values_list(
+                'posts_count', flat=True)), [0, 0])
+        self.assertEqual(
+            self._stats(CountersTestCase.user_author).posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Comment and follow counters follow create and delete."""
+        post = Post.objects.create(text='Test post',
+                                   author=CountersTestCase.user_author)
+        comment = Comment.objects.create(text='Test comment', post=post,
+                                         author=CountersTestCase.user_reader)
+        follow = Follow.objects.create(user=CountersTestCase.user_reader,
+                                       author=CountersTestCase.user_author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            self._stats(CountersTestCase.user_author).followers_count, 1)
+        self.assertEqual(
+            self._stats(CountersTestCase.user_reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            self._stats(CountersTestCase.user_author).followers_count, 0)
+
+    def test_recount_counters_repairs_drift(self):
+        """recount_counters recomputes counters from the source tables."""
+        Post.objects.create(text='Test post',
+                            author=CountersTestCase.user_author,
+                            group=CountersTestCase.group)
+        Follow.objects.create(user=CountersTestCase.user_reader,
+                              author=CountersTestCase.user_author)
+        Group.objects.update(posts_count=42)
+        UserStats.objects.update(posts_count=42, followers_count=42)
+        call_command('recount_counters', stdout=StringIO())
+        CountersTestCase.group.refresh_from_db()
+        stats = self._stats(CountersTestCase.user_author)
+        self.assertEqual(CountersTestCase.group.posts_count, 1)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+
+    def test_profile_reads_stored_counter(self):
+        """The profile page reads the stored post counter."""
+        Post.objects.create(text='Test post',
+                            author=CountersTestCase.user_author)
+        UserStats.objects.filter(user=CountersTestCase.user_author).update(
+            posts_count=7)
+        response = CountersTestCase.client_author.get(
+            reverse('posts:profile', kwargs={'username': 'Author'}))
+        self.assertContains(response, 'Всего постов: 7')
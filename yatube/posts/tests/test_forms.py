@@ -88,11 +88,14 @@ class FormTestCase(TestCase):
             'author': FormTestCase.user_author,
             'group_id': FormTestCase.form_data['group'],
             'text': FormTestCase.form_data['text'],
-            'image': image_uploaded_route + FormTestCase.uploaded_image.name,
         }
         for field, val in expected_new_post_atributes.items():
             with self.subTest(field=field):
                 self.assertEqual(new_post.__getattribute__(field), val)
+        self.assertRegex(
+            new_post.image.name,
+            rf'^{image_uploaded_route}[0-9a-f]{{2}}/[0-9a-f]{{2}}/'
+            rf'[0-9a-f]{{64}}\.gif$')
 
     def test_guests_created_page_work_correctly(self):
         """The "/create/" page make redirect unauth client on "/login/" page,
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.images import normalize_image
+from posts.models import Post, User
+from yatube.settings import BASE_DIR
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def make_upload(name, size, image_format='JPEG', exif=None):
+    buffer = BytesIO()
+    options = {'exif': exif.tobytes()} if exif else {}
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    return SimpleUploadedFile(name=name, content=buffer.getvalue(),
+                              content_type=f'image/{image_format.lower()}')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True,
+                   IMAGE_MAX_SIDE=100, IMAGE_VARIANT_WIDTHS=(40, 80, 160))
+class ImagesTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.user_author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_is_bounded_and_stripped(self):
+        """EXIF is applied to the orientation and dropped, size bounded."""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[MAKE] = 'Camera'
+        normalized, _ = normalize_image(
+            make_upload('photo.jpeg', (400, 200), exif=exif))
+        image = Image.open(normalized)
+        self.assertEqual(image.size, (50, 100))
+        self.assertFalse(image.getexif())
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_decompression_bomb_is_refused(self):
+        """Images above IMAGE_MAX_PIXELS do not pass the form."""
+        form = PostForm(data={'text': 'Test post'},
+                        files={'image': make_upload('big.png', (20, 20),
+                                                    'PNG')})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_variants_are_listed_in_srcset(self):
+        """Variants up to the image width are made and shown in srcset."""
+        ImagesTestCase.client_author.post(
+            reverse('posts:post_create'),
+            {'text': 'Test post',
+             'image': make_upload('photo.jpg', (90, 60))})
+        post = Post.objects.get()
+        storage = post.image.storage
+        self.assertEqual(Image.open(storage.open(post.thumbnail)).size,
+                         (80, 28))
+        srcset = post.image_srcset['jpeg']
+        self.assertEqual(srcset.count('w, '), 1)
+        self.assertIn(f'{storage.url(post.thumbnail)} 80w', srcset)
+        response = ImagesTestCase.client_author.get(reverse('posts:index'))
+        self.assertContains(response, f'srcset="{srcset}"')
+
+    def test_description_is_stored_on_upload(self):
+        """Size, dominant color and placeholder are stored on the post."""
+        ImagesTestCase.client_author.post(
+            reverse('posts:post_create'),
+            {'text': 'Test post',
+             'image': make_upload('photo.jpg', (90, 60))})
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (90, 60))
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        self.assertGreater(int(post.image_color[1:3], 16), 200)
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,'))
+
+    def test_feed_lays_out_images_without_reading_them(self):
+        """The feed sizes images from the post and lazy loads all but
+        the first one without opening any image file.
+        """
+        for _ in range(2):
+            ImagesTestCase.client_author.post(
+                reverse('posts:post_create'),
+                {'text': 'Test post',
+                 'image': make_upload('photo.jpg', (90, 60))})
+        post = Post.objects.first()
+        with mock.patch('PIL.Image.open') as image_open, mock.patch(
+                'core.storage.HashedStorage.open') as storage_open:
+            content = ImagesTestCase.client_author.get(
+                reverse('posts:index')).getvalue().decode()
+        image_open.assert_not_called()
+        storage_open.assert_not_called()
+        self.assertEqual(content.count('width="80" height="28"'), 2)
+        self.assertEqual(content.count('loading="lazy"'), 1)
+        self.assertIn(f'background: {post.image_color} '
+                      f'url({post.image_placeholder})', content)
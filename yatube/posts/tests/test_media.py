@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import sweep
+from posts.models import Post, User
+from yatube.settings import BASE_DIR
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
+
+IMAGE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaStorageTestCase(TransactionTestCase):
+    def setUp(self):
+        self.user_author = User.objects.create(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def _create_post(self, name):
+        return Post.objects.create(
+            text='Test post', author=self.user_author,
+            image=SimpleUploadedFile(name=name, content=IMAGE,
+                                     content_type='image/gif'))
+
+    def test_identical_uploads_share_a_file(self):
+        """Posts with identical images reference one stored file."""
+        first = self._create_post('first.gif')
+        second = self._create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            StoredFile.objects.get(name=first.image.name).references, 2)
+        first.delete()
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        second.delete()
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        sweep(second.image.storage, grace_period=0)
+        self.assertFalse(second.image.storage.exists(second.image.name))
+
+    def test_hash_media_moves_legacy_files(self):
+        """hash_media renames legacy uploads and merges duplicates."""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        posts = []
+        for name in ('posts/legacy1.gif', 'posts/legacy2.gif'):
+            with open(os.path.join(TEMP_MEDIA_ROOT, name), 'wb') as file:
+                file.write(IMAGE)
+            posts.append(Post.objects.create(
+                text='Legacy post', author=self.user_author, image=name))
+        call_command('hash_media', stdout=StringIO())
+        names = {post.image.name
+                 for post in Post.objects.filter(pk__in=[
+                     post.pk for post in posts])}
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts'))),
+            [name.split('/')[1]])
+
+    def test_hash_media_leaves_edited_posts(self):
+        """A post edited while its files are linked keeps its image and
+        the unused link is left to the sweeper.
+        """
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts/legacy.gif'),
+                  'wb') as file:
+            file.write(IMAGE)
+        post = Post.objects.create(
+            text='Legacy post', author=self.user_author,
+            image='posts/legacy.gif')
+        with mock.patch('posts.management.commands.hash_media._rename',
+                        return_value=False):
+            call_command('hash_media', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, 'posts/legacy.gif')
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        hashed = StoredFile.objects.get()
+        self.assertEqual(hashed.references, 0)
+        sweep(post.image.storage, grace_period=0)
+        self.assertFalse(post.image.storage.exists(hashed.name))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        post.image.storage.delete(post.image.name)
@@ -0,0 +1,160 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+from posts.paginators import (CachedCountPaginator, KeysetPaginator,
+                              decode_cursor, encode_cursor)
+from yatube.settings import PAGINATOR_NUM_PAGE
+
+
+class KeysetPaginatorTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='Author')
+        cls.client_guest = Client()
+        Post.objects.bulk_create([
+            Post(text=f'Post {num}', author=cls.user)
+            for num in range(PAGINATOR_NUM_PAGE * 2 + 5)
+        ])
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def _walk(self, paginator):
+        """Follow next cursors from the first page to the last one."""
+        page = paginator.get_cursor_page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_cursor_page(after=page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_cursor_round_trip(self):
+        """Cursor token decodes to the pub_date and id of the post."""
+        post = KeysetPaginatorTestCase.expected[0]
+        self.assertEqual(decode_cursor(encode_cursor(post.pub_date, post.pk)),
+                         (post.pub_date, post.pk))
+        self.assertIsNone(decode_cursor('not a cursor'))
+
+    def test_next_cursors_visit_every_post_once(self):
+        """Pages linked by next cursors cover the feed in order."""
+        paginator = KeysetPaginator(Post.objects.all(), PAGINATOR_NUM_PAGE)
+        pages = self._walk(paginator)
+        self.assertEqual([len(page) for page in pages],
+                         [PAGINATOR_NUM_PAGE, PAGINATOR_NUM_PAGE, 5])
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual([post for page in pages for post in page],
+                         KeysetPaginatorTestCase.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """The previous cursor of a page leads back to the page before."""
+        paginator = KeysetPaginator(Post.objects.all(), PAGINATOR_NUM_PAGE)
+        pages = self._walk(paginator)
+        for number in (2, 1):
+            with self.subTest(number=number):
+                page = paginator.get_cursor_page(
+                    before=pages[number].previous_cursor)
+                self.assertEqual(list(page), list(pages[number - 1]))
+
+    def test_pages_are_stable_when_posts_are_added(self):
+        """A new post does not shift the posts of a cursor page."""
+        paginator = KeysetPaginator(Post.objects.all(), PAGINATOR_NUM_PAGE)
+        first_page = paginator.get_cursor_page()
+        expected = list(paginator.get_cursor_page(
+            after=first_page.next_cursor))
+        Post.objects.create(text='New post', author=self.user)
+        page = paginator.get_cursor_page(after=first_page.next_cursor)
+        self.assertEqual(list(page), expected)
+
+    def test_page_cost_does_not_depend_on_depth(self):
+        """Every cursor page is fetched with a single query."""
+        paginator = KeysetPaginator(Post.objects.all(), PAGINATOR_NUM_PAGE)
+        first_page = paginator.get_cursor_page()
+        last_cursor = paginator.cursor_for(
+            KeysetPaginatorTestCase.expected[-2])
+        for cursor in (first_page.next_cursor, last_cursor):
+            with self.subTest(cursor=cursor):
+                with self.assertNumQueries(1):
+                    list(paginator.get_cursor_page(after=cursor))
+
+    def test_feed_views_accept_cursor(self):
+        """Feed views serve cursor pages for the ?after= parameter."""
+        post = KeysetPaginatorTestCase.expected[PAGINATOR_NUM_PAGE - 1]
+        cursor = encode_cursor(post.pub_date, post.pk)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = KeysetPaginatorTestCase.client_guest.get(
+                    url, {'after': cursor})
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    KeysetPaginatorTestCase.expected[
+                        PAGINATOR_NUM_PAGE:PAGINATOR_NUM_PAGE * 2])
+                self.assertContains(response, '?before=')
+
+
+class CachedCountPaginatorTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        Post.objects.bulk_create([
+            Post(text=f'Post {num}', author=cls.user)
+            for num in range(PAGINATOR_NUM_PAGE + 1)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """The count is read from the cache by the next paginator."""
+        CachedCountPaginator(
+            Post.objects.all(), PAGINATOR_NUM_PAGE, count_key='test').count
+        paginator = CachedCountPaginator(
+            Post.objects.all(), PAGINATOR_NUM_PAGE, count_key='test')
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, PAGINATOR_NUM_PAGE + 1)
+
+    @override_settings(PAGINATOR_ESTIMATE_ABOVE=5)
+    def test_estimate_above_limit_is_used(self):
+        """Estimates above PAGINATOR_ESTIMATE_ABOVE replace COUNT(*)."""
+        paginator = CachedCountPaginator(
+            Post.objects.all(), PAGINATOR_NUM_PAGE, estimate=lambda: 1000)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.num_pages, 1000 // PAGINATOR_NUM_PAGE)
+        self.assertFalse(paginator.count_is_exact)
+        response = CachedCountPaginatorTestCase.client_reader.get(
+            reverse('posts:index'), {'page': 1})
+        self.assertContains(response, 'из ~')
+
+    @override_settings(PAGINATOR_ESTIMATE_ABOVE=5)
+    def test_stored_count_is_exact(self):
+        """Stored counters replace COUNT(*) and are shown as exact."""
+        paginator = CachedCountPaginator(
+            Post.objects.all(), PAGINATOR_NUM_PAGE, stored_count=lambda: 20)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.num_pages, 2)
+        self.assertTrue(paginator.count_is_exact)
+        response = CachedCountPaginatorTestCase.client_reader.get(
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            {'page': 1})
+        self.assertNotContains(response, 'из ~')
+
+    def test_follow_count_is_invalidated_by_new_post(self):
+        """A new post of a followed author updates the follow feed count."""
+        url = reverse('posts:follow_index')
+        client = CachedCountPaginatorTestCase.client_reader
+        response = client.get(url, {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         PAGINATOR_NUM_PAGE + 1)
+        Post.objects.create(text='New post', author=self.user)
+        response = client.get(url, {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         PAGINATOR_NUM_PAGE + 2)
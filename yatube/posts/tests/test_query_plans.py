@@ -0,0 +1,91 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry,
+                          User)
+from posts.paginators import encode_cursor
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class QueryPlanTestCase(TestCase):
+    """Feed and comment queries must be served by indexes."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.user_reader = User.objects.create(username='Reader')
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.user_reader)
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        Follow.objects.create(user=cls.user_reader, author=cls.user_author)
+        cls.post = Post.objects.create(text='Test post',
+                                       author=cls.user_author,
+                                       group=cls.group)
+        comment = Comment.objects.create(text='Test comment', post=cls.post,
+                                         author=cls.user_reader)
+        after = '?after=' + encode_cursor(cls.post.pub_date, cls.post.pk)
+        comments_after = '?after=' + encode_cursor(comment.created,
+                                                   comment.pk)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=1',
+            reverse('posts:index') + after,
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:group_list',
+                    kwargs={'slug': cls.group.slug}) + after,
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}) + after,
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + after,
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+            reverse('posts:post_comments',
+                    kwargs={'post_id': cls.post.pk}) + comments_after,
+        )
+
+    def _explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def _view_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            QueryPlanTestCase.client_reader.get(url)
+        return [query['sql'] for query in context.captured_queries
+                if '"posts_' in query['sql']
+                and query['sql'].startswith('SELECT')]
+
+    def _assert_indexed(self, urls):
+        for url in urls:
+            for sql in self._view_queries(url):
+                plan = self._explain(sql)
+                with self.subTest(url=url, sql=sql, plan=plan):
+                    self.assertFalse(
+                        [step for step in plan if FULL_SCAN.match(step)])
+                    self.assertFalse(
+                        [step for step in plan if TEMP_SORT in step])
+
+    def test_view_queries_use_indexes(self):
+        """No posts query of the views scans a table or sorts in memory."""
+        self._assert_indexed(QueryPlanTestCase.urls)
+
+    @override_settings(FOLLOW_TIMELINE_FANOUT_LIMIT=0)
+    def test_pull_follow_feed_uses_indexes(self):
+        """Follow feeds of authors over the fan-out limit, whose posts
+        are pulled at read time, are served by indexes too.
+        """
+        post = Post.objects.create(text='Pulled post',
+                                   author=QueryPlanTestCase.user_author)
+        self._assert_indexed(
+            url for url in QueryPlanTestCase.urls if url.startswith(
+                reverse('posts:follow_index')))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=QueryPlanTestCase.user_reader, post=post).exists())
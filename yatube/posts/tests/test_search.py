@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post, User
+from yatube.settings import PAGINATOR_NUM_PAGE
+
+
+class SearchTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Author')
+        cls.post = Post.objects.create(
+            text='Утренняя прогулка по набережной <b>реки</b>',
+            author=cls.user)
+        cls.comment = Comment.objects.create(
+            text='Прогулка удалась', post=cls.post, author=cls.user)
+        cls.client_guest = Client()
+
+    def _indexed(self, model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, text FROM {search.SEARCH_TABLES[model]} '
+                'ORDER BY rowid')
+            return cursor.fetchall()
+
+    def test_build_query_quotes_words(self):
+        """FTS5 syntax in a query is searched as words."""
+        self.assertEqual(search.build_query('NOT "река" AND *'),
+                         '"NOT" "река" "AND"')
+        self.assertEqual(search.build_query('  -*- '), '')
+
+    def test_index_follows_save_and_delete(self):
+        """Saved texts are indexed and deleted objects are removed."""
+        post = Post.objects.create(text='Первый текст',
+                                   author=SearchTestCase.user)
+        self.assertIn((post.pk, 'Первый текст'), self._indexed(Post))
+        post.text = 'Второй текст'
+        post.save()
+        self.assertIn((post.pk, 'Второй текст'), self._indexed(Post))
+        self.assertNotIn((post.pk, 'Первый текст'), self._indexed(Post))
+        comment = Comment.objects.create(text='Комментарий', post=post,
+                                         author=SearchTestCase.user)
+        self.assertIn((comment.pk, 'Комментарий'), self._indexed(Comment))
+        post.delete()
+        self.assertNotIn(post.pk, dict(self._indexed(Post)))
+        self.assertNotIn(comment.pk, dict(self._indexed(Comment)))
+
+    def test_bulk_created_posts_are_indexed(self):
+        Post.objects.bulk_create([
+            Post(text=f'Пакетный пост {num}', author=SearchTestCase.user)
+            for num in range(3)])
+        self.assertEqual(
+            search.search('пакетный').count(), 3)
+
+    def test_search_ranks_posts_and_comments(self):
+        """Posts and comments are found case-insensitively with their
+        snippets escaped and highlighted.
+        """
+        results = search.search('ПРОГУЛКА')
+        self.assertEqual(results.count(), 2)
+        hits = results[0:10]
+        self.assertEqual({hit.comment for hit in hits},
+                         {None, SearchTestCase.comment})
+        self.assertTrue(all(hit.post == SearchTestCase.post for hit in hits))
+        post_hit = next(hit for hit in hits if hit.comment is None)
+        self.assertIn('<mark>прогулка</mark>', post_hit.snippet)
+        self.assertIn('&lt;b&gt;', post_hit.snippet)
+
+    def test_search_view_paginates_results(self):
+        Post.objects.bulk_create([
+            Post(text=f'Заметка номер {num}', author=SearchTestCase.user)
+            for num in range(PAGINATOR_NUM_PAGE + 3)])
+        url = reverse('posts:search')
+        response = SearchTestCase.client_guest.get(url, {'q': 'заметка'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']),
+                         PAGINATOR_NUM_PAGE)
+        self.assertContains(response, '<mark>Заметка</mark>')
+        self.assertContains(response, '?q=%D0%B7%D0%B0%D0%BC%D0%B5%D1%82'
+                                      '%D0%BA%D0%B0&amp;page=2')
+        response = SearchTestCase.client_guest.get(
+            url, {'q': 'заметка', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 3)
+        response = SearchTestCase.client_guest.get(url, {'q': '""'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_search_uses_index(self):
+        request = RequestFactory().get('/')
+        for model, obj in ((Post, SearchTestCase.post),
+                           (Comment, SearchTestCase.comment)):
+            admin = site._registry[model]
+            queryset, may_have_duplicates = admin.get_search_results(
+                request, model.objects.all(), 'прогулка')
+            self.assertIn('MATCH', str(queryset.query))
+            self.assertEqual(list(queryset), [obj])
+
+    def test_rebuild_command_restores_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {search.SEARCH_TABLES[Post]}')
+        self.assertEqual(search.search('набережной').count(), 0)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search('набережной').count(), 1)
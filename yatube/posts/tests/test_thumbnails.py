@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from yatube.settings import BASE_DIR
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
+
+IMAGE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class ThumbnailsTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.user_author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def _upload(self, name):
+        return SimpleUploadedFile(name=name, content=IMAGE,
+                                  content_type='image/gif')
+
+    def test_thumbnail_is_made_on_upload(self):
+        """post_create stores the thumbnail of the uploaded image."""
+        ThumbnailsTestCase.client_author.post(
+            reverse('posts:post_create'),
+            {'text': 'Test post', 'image': self._upload('create.gif')})
+        post = Post.objects.get()
+        self.assertTrue(post.thumbnail)
+        self.assertTrue(post.image.storage.exists(post.thumbnail))
+        self.assertNotEqual(post.thumbnail_url, post.image.url)
+
+    def test_replaced_image_gets_new_thumbnail(self):
+        """post_edit remakes the thumbnail of a replaced image only."""
+        post = Post.objects.create(text='Test post',
+                                   author=ThumbnailsTestCase.user_author,
+                                   image=self._upload('old.gif'),
+                                   thumbnail='old-thumbnail.jpg')
+        url = reverse('posts:post_edit', kwargs={'post_id': post.pk})
+        ThumbnailsTestCase.client_author.post(url, {'text': 'Edited post'})
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail, 'old-thumbnail.jpg')
+        ThumbnailsTestCase.client_author.post(
+            url, {'text': 'Edited post', 'image': self._upload('new.gif')})
+        post.refresh_from_db()
+        self.assertNotIn(post.thumbnail, ('', 'old-thumbnail.jpg'))
+
+    def test_pages_do_not_make_thumbnails(self):
+        """Feed pages show the stored thumbnail without resizing images."""
+        post = Post.objects.create(text='Test post',
+                                   author=ThumbnailsTestCase.user_author,
+                                   image=self._upload('stored.gif'),
+                                   thumbnail='posts/stored-thumbnail.jpg')
+        with mock.patch('sorl.thumbnail.base.ThumbnailBackend'
+                        '.get_thumbnail') as get_thumbnail:
+            response = ThumbnailsTestCase.client_author.get(
+                reverse('posts:index'))
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, post.thumbnail_url)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=False)
+    def test_original_is_shown_until_thumbnail_is_made(self):
+        """The worker runs after commit; until then the image is shown."""
+        ThumbnailsTestCase.client_author.post(
+            reverse('posts:post_create'),
+            {'text': 'Test post', 'image': self._upload('pending.gif')})
+        post = Post.objects.get()
+        self.assertEqual(post.thumbnail, '')
+        response = ThumbnailsTestCase.client_author.get(
+            reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+
+    def _backfill(self, *args):
+        checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'checkpoint')
+        call_command('backfill_thumbnails', '--processes=0',
+                     f'--checkpoint={checkpoint}', *args,
+                     stdout=StringIO(), stderr=StringIO())
+        return checkpoint
+
+    def test_backfill_makes_variants_of_all_images(self):
+        """backfill_thumbnails makes variants of every post image."""
+        posts = [Post.objects.create(text=f'Post {num}',
+                                     author=ThumbnailsTestCase.user_author,
+                                     image=self._upload(f'post{num}.gif'))
+                 for num in range(3)]
+        Post.objects.create(text='No image',
+                            author=ThumbnailsTestCase.user_author)
+        checkpoint = self._backfill('--batch-size=2')
+        for post in posts:
+            post.refresh_from_db()
+            self.assertTrue(post.image_variants)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_backfill_resumes_after_checkpoint(self):
+        """Posts up to the checkpoint are not processed again."""
+        posts = [Post.objects.create(text=f'Post {num}',
+                                     author=ThumbnailsTestCase.user_author,
+                                     image=self._upload(f'resume{num}.gif'))
+                 for num in range(2)]
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'checkpoint'), 'w') as file:
+            file.write(str(posts[0].pk))
+        self._backfill()
+        self.assertEqual(
+            [bool(post.image_variants) for post in
+             Post.objects.filter(pk__in=[post.pk for post in posts])
+             .order_by('pk')],
+            [False, True])
@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.paginators import KeysetPaginator
+from posts.timeline import DATE_FIELD, ID_FIELD, get_follow_feed
+
+
+class TimelineTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.user_reader = User.objects.create(username='Reader')
+        cls.user_other = User.objects.create(username='Other')
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """A new post lands in the timelines of the author's followers."""
+        Follow.objects.create(user=TimelineTestCase.user_reader,
+                              author=TimelineTestCase.user_author)
+        post = Post.objects.create(text='Test post',
+                                   author=TimelineTestCase.user_author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTestCase.user_reader, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=TimelineTestCase.user_other).exists())
+
+    def test_bulk_created_posts_are_fanned_out(self):
+        """Only the bulk created posts reach the followers' timelines."""
+        old_post = Post.objects.create(text='Old post',
+                                       author=TimelineTestCase.user_author)
+        Post.objects.filter(pk=old_post.pk).update(
+            pub_date=old_post.pub_date + timedelta(days=1))
+        # A follow without signals is not backfilled.
+        Follow.objects.bulk_create([Follow(
+            user=TimelineTestCase.user_reader,
+            author=TimelineTestCase.user_author)])
+        Post.objects.bulk_create([
+            Post(text='New post', author=TimelineTestCase.user_author)])
+        self.assertEqual(
+            [post.text for post in get_follow_feed(
+                TimelineTestCase.user_reader)], ['New post'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Following copies old posts, unfollowing removes them."""
+        posts = [Post.objects.create(text=f'Post {num}',
+                                     author=TimelineTestCase.user_author)
+                 for num in range(3)]
+        follow = Follow.objects.create(user=TimelineTestCase.user_reader,
+                                       author=TimelineTestCase.user_author)
+        self.assertEqual(
+            list(get_follow_feed(TimelineTestCase.user_reader)),
+            posts[::-1])
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=TimelineTestCase.user_reader).exists())
+
+    @override_settings(FOLLOW_TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_posts_are_pulled(self):
+        """Posts of authors over the fan-out limit are pulled into the
+        timeline of a follower when the follower reads the feed.
+        """
+        old_post = Post.objects.create(text='Old post',
+                                       author=TimelineTestCase.user_author)
+        Follow.objects.create(user=TimelineTestCase.user_reader,
+                              author=TimelineTestCase.user_author)
+        Follow.objects.create(user=TimelineTestCase.user_other,
+                              author=TimelineTestCase.user_author)
+        post = Post.objects.create(text='Test post',
+                                   author=TimelineTestCase.user_author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            list(get_follow_feed(TimelineTestCase.user_reader)),
+            [post, old_post])
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=TimelineTestCase.user_other, post=post).exists())
+        with self.assertNumQueries(1):
+            get_follow_feed(TimelineTestCase.user_reader)
+
+    @override_settings(FOLLOW_TIMELINE_FANOUT_LIMIT=1,
+                       BACKGROUND_TASKS_EAGER=True)
+    def test_pulled_posts_reach_author_pushed_again(self):
+        """Posts published while the author was pulled reach the
+        followers once an unfollow makes the author pushed again.
+        """
+        for user in TimelineTestCase.user_reader, TimelineTestCase.user_other:
+            Follow.objects.create(user=user,
+                                  author=TimelineTestCase.user_author)
+        post = Post.objects.create(text='Test post',
+                                   author=TimelineTestCase.user_author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=TimelineTestCase.user_other).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTestCase.user_reader, post=post).exists())
+        new_post = Post.objects.create(text='New post',
+                                       author=TimelineTestCase.user_author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTestCase.user_reader, post=new_post).exists())
+
+    def test_cursor_pages_follow_timeline_order(self):
+        """Cursor pages are keyed on the timeline date and post."""
+        Follow.objects.create(user=TimelineTestCase.user_reader,
+                              author=TimelineTestCase.user_author)
+        posts = [Post.objects.create(text=f'Post {num}',
+                                     author=TimelineTestCase.user_author)
+                 for num in range(5)]
+        paginator = KeysetPaginator(
+            get_follow_feed(TimelineTestCase.user_reader), 2,
+            date_field=DATE_FIELD, id_field=ID_FIELD)
+        page = paginator.get_cursor_page()
+        pages = [list(page)]
+        while page.has_next():
+            page = paginator.get_cursor_page(after=page.next_cursor)
+            pages.append(list(page))
+        self.assertEqual(pages, [posts[4:2:-1], posts[2:0:-1], posts[:1]])
+        page = paginator.get_cursor_page(before=page.previous_cursor)
+        self.assertEqual(list(page), posts[2:0:-1])
+
+    def test_follow_feed_is_read_with_one_query(self):
+        """The follow feed is one query over the timeline table."""
+        Follow.objects.create(user=TimelineTestCase.user_reader,
+                              author=TimelineTestCase.user_author)
+        Post.objects.create(text='Test post',
+                            author=TimelineTestCase.user_author)
+        feed = get_follow_feed(TimelineTestCase.user_reader)
+        with self.assertNumQueries(1):
+            list(feed)
+        self.assertIn('posts_timelineentry', str(feed.query))
@@ -1,14 +1,22 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
-from posts.models import Follow, Group, Post, User
-from yatube.settings import BASE_DIR, PAGINATOR_NUM_PAGE
+from posts import follows, lookups
+from posts.models import Comment, Follow, Group, Post, User
+from posts.views import get_comments_page
+from yatube.settings import BASE_DIR, COMMENTS_NUM_PAGE, PAGINATOR_NUM_PAGE
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
 
@@ -218,25 +226,63 @@ class ViewsTestCase(TestCase):
     def test_cache_on_index_page(self):
         """Test the cache on index page"""
         client = ViewsTestCase.client_author
-        response_first = client.get(
-            ViewsTestCase.pages_attributes['index']['reversed_name']
-        )
-        content_first = response_first.content
+        url = ViewsTestCase.pages_attributes['index']['reversed_name']
+        cache.clear()
+        content_first = client.get(url).content
+        Post.objects.filter(pk=ViewsTestCase.post.pk).update(
+            text='changed without signals')
+        content_second = client.get(url).content
+        self.assertEqual(content_first, content_second, '<Page is not cached>')
+        Post.objects.filter(pk=ViewsTestCase.post.pk).update(
+            text=ViewsTestCase.post.text)
         test_post = Post.objects.create(
             text='test_cache_post',
             author=ViewsTestCase.user_author,)
-        response_second = client.get(
-            ViewsTestCase.pages_attributes['index']['reversed_name']
-        )
-        content_second = response_second.content
-        self.assertEqual(content_first, content_second, '<Page is not cached>')
+        response_third = client.get(url)
+        self.assertContains(response_third, test_post.text)
+        test_post.delete()
+        self.assertNotContains(client.get(url), test_post.text)
+
+    def test_feed_cache_varies_on_page(self):
+        """Cached post lists are stored per page."""
+        Post.objects.bulk_create([
+            Post(text=f'Cached post {num}',
+                 author=ViewsTestCase.user_author,
+                 group=ViewsTestCase.group,)
+            for num in range(PAGINATOR_NUM_PAGE)
+        ])
         cache.clear()
-        response_third = client.get(
-            ViewsTestCase.pages_attributes['index']['reversed_name']
-        )
-        self.assertIn(test_post,
-                      response_third.context['page_obj'],
-                      '<Post was not added in cotext>', )
+        client = ViewsTestCase.client_author
+        for name in 'index', 'group_list', 'profile':
+            with self.subTest(name=name):
+                url = ViewsTestCase.pages_attributes[name]['reversed_name']
+                client.get(url, {'page': 1})
+                response = client.get(url, {'page': 2})
+                self.assertContains(response, ViewsTestCase.post.text)
+
+    def test_feed_cache_follows_names_and_counters(self):
+        """Cached post lists show the current author names and group
+        titles and counters, whoever changed them.
+        """
+        cache.clear()
+        client = ViewsTestCase.client_not_author
+        group_url = ViewsTestCase.pages_attributes[
+            'group_list']['reversed_name']
+        profile_url = ViewsTestCase.pages_attributes[
+            'profile']['reversed_name']
+        client.get(group_url)
+        client.get(profile_url)
+        author = User.objects.get(pk=ViewsTestCase.user_author.pk)
+        author.first_name = 'Renamed'
+        author.save()
+        self.assertContains(client.get(group_url), 'Автор: Renamed')
+        Post.objects.create(text='Other post', group=ViewsTestCase.group,
+                            author=ViewsTestCase.user_not_author)
+        self.assertContains(client.get(profile_url), 'test group (2)')
+        group = Group.objects.get(pk=ViewsTestCase.group.pk)
+        group.title = 'renamed group'
+        group.save()
+        self.assertContains(client.get(profile_url), 'renamed group (2)')
 
 
 class FollowTestCase(TestCase):
@@ -331,3 +377,503 @@ class FollowTestCase(TestCase):
             for post in (i for i in test_posts if i != expected_post):
                 with self.subTest(user=user, post=post):
                     self.assertNotIn(post, response.context['page_obj'])
+
+
+class FeedQueriesTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.user_reader = User.objects.create(username='Reader')
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.user_reader)
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        Follow.objects.create(user=cls.user_reader, author=cls.user_author)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            reverse('posts:follow_index'),
+        )
+
+    def _count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            FeedQueriesTestCase.client_reader.get(url)
+        return len(queries)
+
+    def _create_posts(self, amount):
+        Post.objects.bulk_create([
+            Post(text=f'Post {num}', author=FeedQueriesTestCase.user_author,
+                 group=FeedQueriesTestCase.group) for num in range(amount)
+        ])
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Feed pages run a fixed number of queries for any page size."""
+        self._create_posts(1)
+        expected = {url: self._count_queries(url)
+                    for url in FeedQueriesTestCase.urls}
+        self._create_posts(PAGINATOR_NUM_PAGE)
+        for url in FeedQueriesTestCase.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self._count_queries(url), expected[url])
+
+    def test_cached_fragments_skip_page_query(self):
+        """Members get the cached posts of a feed without its query."""
+        self._create_posts(1)
+        cache.clear()
+        for url in FeedQueriesTestCase.urls[:3]:
+            FeedQueriesTestCase.client_reader.get(url)
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = FeedQueriesTestCase.client_reader.get(url)
+                self.assertContains(response, 'Post 0')
+                self.assertFalse([query for query in queries
+                                  if '"posts_post"."text"' in query['sql']])
+
+    def test_post_detail_fetches_author_and_group_once(self):
+        """post_detail fetches the post with its author and group."""
+        self._create_posts(1)
+        post = Post.objects.get()
+        cache.clear()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with CaptureQueriesContext(connection) as queries:
+            response = FeedQueriesTestCase.client_reader.get(url)
+        self.assertContains(response, 'все записи группы (1)')
+        post_queries = [query for query in queries
+                        if '"posts_post"."text"' in query['sql']
+                        and 'WHERE "posts_post"."id"' in query['sql']]
+        self.assertEqual(len(post_queries), 1)
+
+
+class CommentsPaginationTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.post = Post.objects.create(text='Test post',
+                                       author=cls.user_author)
+        Comment.objects.bulk_create([
+            Comment(text=f'Comment {num}', post=cls.post,
+                    author=cls.user_author)
+            for num in range(COMMENTS_NUM_PAGE + 5)
+        ])
+        cls.client_guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_batch(self):
+        """post_detail renders the first batch of comments only."""
+        response = CommentsPaginationTestCase.client_guest.get(reverse(
+            'posts:post_detail',
+            kwargs={'post_id': CommentsPaginationTestCase.post.pk}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_NUM_PAGE)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'data-fragment-url')
+
+    def test_comment_queries_do_not_depend_on_batch_size(self):
+        """Comments are fetched with their authors in one query."""
+        page = get_comments_page(
+            RequestFactory().get('/'), CommentsPaginationTestCase.post.pk)
+        with self.assertNumQueries(0):
+            authors = [comment.author.username for comment in page]
+        self.assertEqual(len(authors), COMMENTS_NUM_PAGE)
+
+    def test_fragment_returns_next_batch(self):
+        """The comments fragment returns the comments after the cursor."""
+        client = CommentsPaginationTestCase.client_guest
+        first = client.get(reverse(
+            'posts:post_detail',
+            kwargs={'post_id': CommentsPaginationTestCase.post.pk}
+        )).context['comments']
+        response = client.get(
+            reverse('posts:post_comments',
+                    kwargs={'post_id': CommentsPaginationTestCase.post.pk}),
+            {'after': first.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertFalse(set(response.context['comments']) & set(first))
+        self.assertNotContains(response, '<html')
+
+    def test_fragment_of_missing_post_is_not_found(self):
+        """The comments fragment of a missing post returns 404."""
+        response = CommentsPaginationTestCase.client_guest.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
+
+class StreamingTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        Post.objects.bulk_create([
+            Post(text=f'Streamed post {num}', author=cls.user_author,
+                 group=cls.group)
+            for num in range(PAGINATOR_NUM_PAGE + 1)
+        ])
+        cls.client_guest = Client()
+
+    def test_streamed_feed_matches_rendered_feed(self):
+        """A streamed feed page has the same posts as the rendered one."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': 'test_slug'}),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': 'Author'}),
+        }
+        for name, url in urls.items():
+            with self.subTest(name=name):
+                cache.clear()
+                rendered = StreamingTestCase.client_guest.get(url)
+                cache.clear()
+                with mock.patch('posts.views.STREAMING_VIEWS', [name]):
+                    streamed = StreamingTestCase.client_guest.get(url)
+                self.assertTrue(streamed.streaming)
+                content = b''.join(streamed.streaming_content).decode()
+                self.assertEqual(content.count('<article>'),
+                                 PAGINATOR_NUM_PAGE)
+                self.assertIn('</html>', content)
+                for post in rendered.context['page_obj']:
+                    self.assertIn(post.text, content)
+                self.assertNotIn('<!-- stream -->', content)
+
+
+class ConditionalGetTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.user_reader = User.objects.create(username='Reader')
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.user_reader)
+        cls.client_guest = Client()
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        cls.post = Post.objects.create(text='Test post',
+                                       author=cls.user_author,
+                                       group=cls.group)
+        cls.urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': 'test_slug'}),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': 'Author'}),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        }
+
+    def _revalidate(self, client, url):
+        """Request the url with the ETag of its previous response."""
+        # The first response may set the CSRF cookie the ETag depends on.
+        client.get(url)
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_is_not_modified(self):
+        """A matching ETag is answered with 304 without rendering."""
+        for name, url in ConditionalGetTestCase.urls.items():
+            with self.subTest(name=name):
+                response = self._revalidate(
+                    ConditionalGetTestCase.client_reader, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+                self.assertEqual(response.content, b'')
+
+    def test_edited_post_changes_validators(self):
+        """Editing a post changes the ETag of every page showing it."""
+        client = ConditionalGetTestCase.client_reader
+        etags = {name: client.get(url)['ETag']
+                 for name, url in ConditionalGetTestCase.urls.items()}
+        post = Post.objects.get(pk=ConditionalGetTestCase.post.pk)
+        post.text = 'Edited post'
+        post.save()
+        for name, url in ConditionalGetTestCase.urls.items():
+            with self.subTest(name=name):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Edited post')
+
+    def test_new_comment_changes_post_validators(self):
+        """A new comment modifies the post page."""
+        client = ConditionalGetTestCase.client_reader
+        url = ConditionalGetTestCase.urls['posts:post_detail']
+        response = client.get(url)
+        self.assertEqual(
+            response['Last-Modified'],
+            http_date(ConditionalGetTestCase.post.updated.timestamp()))
+        Comment.objects.create(text='Test comment',
+                               post=ConditionalGetTestCase.post,
+                               author=ConditionalGetTestCase.user_reader)
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(response, 'Test comment')
+
+    def test_follow_state_changes_profile_validators(self):
+        """Following the author changes the profile ETag of the reader."""
+        client = ConditionalGetTestCase.client_reader
+        url = ConditionalGetTestCase.urls['posts:profile']
+        etag = client.get(url)['ETag']
+        Follow.objects.create(user=ConditionalGetTestCase.user_reader,
+                              author=ConditionalGetTestCase.user_author)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_changes_post_validators(self):
+        """A page with the CSRF token of a previous login is not reused."""
+        client = Client()
+        client.force_login(ConditionalGetTestCase.user_reader)
+        url = ConditionalGetTestCase.urls['posts:post_detail']
+        client.get(url)
+        etag = client.get(url)['ETag']
+        client.logout()
+        client.force_login(ConditionalGetTestCase.user_reader)
+        client.cookies[settings.CSRF_COOKIE_NAME] = 'rotated'
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_validators_depend_on_viewer(self):
+        """The ETag of a user does not match the page of a guest."""
+        url = ConditionalGetTestCase.urls['posts:index']
+        etag = ConditionalGetTestCase.client_reader.get(url)['ETag']
+        response = ConditionalGetTestCase.client_guest.get(
+            url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class PageCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create(username='Author')
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.user_author)
+        cls.client_guest = Client()
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        cls.post = Post.objects.create(text='Test post',
+                                       author=cls.user_author,
+                                       group=cls.group)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_pages_are_cached_with_surrogate_keys(self):
+        """Guests get the cached page until its keys are purged."""
+        client = PageCacheTestCase.client_guest
+        post = PageCacheTestCase.post
+        response = client.get(reverse('posts:index'))
+        self.assertEqual(response['Surrogate-Key'],
+                         f'index post-{post.pk} author-Author group-test_slug')
+        # A bulk update sends no signals and purges nothing.
+        Post.objects.filter(pk=post.pk).update(text='Unpurged post')
+        with self.assertNumQueries(0):
+            response = client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Unpurged post')
+        response = PageCacheTestCase.client_author.get(reverse('posts:index'))
+        self.assertTemplateUsed(response, 'posts/index.html')
+
+    def test_post_create_purges_feeds(self):
+        """A new post is shown on the cached feeds it belongs to."""
+        client = PageCacheTestCase.client_guest
+        for url in PageCacheTestCase.urls:
+            client.get(url)
+        PageCacheTestCase.client_author.post(
+            reverse('posts:post_create'),
+            {'text': 'New post', 'group': PageCacheTestCase.group.pk})
+        for url in PageCacheTestCase.urls:
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), 'New post')
+
+    def test_bulk_created_posts_purge_feeds(self):
+        """Bulk created posts are shown on the cached feeds."""
+        client = PageCacheTestCase.client_guest
+        for url in PageCacheTestCase.urls:
+            client.get(url)
+        Post.objects.bulk_create([Post(
+            text='Bulk post', author=PageCacheTestCase.user_author,
+            group=PageCacheTestCase.group)])
+        for url in PageCacheTestCase.urls:
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), 'Bulk post')
+
+    def test_post_edit_and_comment_purge_post_pages(self):
+        """Edits and comments are shown on the cached pages of the post."""
+        client = PageCacheTestCase.client_guest
+        post = PageCacheTestCase.post
+        detail_url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        for url in (detail_url, *PageCacheTestCase.urls):
+            client.get(url)
+        PageCacheTestCase.client_author.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Edited post', 'group': PageCacheTestCase.group.pk})
+        PageCacheTestCase.client_author.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'New comment'})
+        for url in (detail_url, *PageCacheTestCase.urls):
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), 'Edited post')
+        self.assertContains(client.get(detail_url), 'New comment')
+
+    def test_renames_purge_pages_showing_them(self):
+        """Pages showing an author or group name show the new one."""
+        client = PageCacheTestCase.client_guest
+        post = PageCacheTestCase.post
+        detail_url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        for url in (detail_url, *PageCacheTestCase.urls):
+            client.get(url)
+        author = User.objects.get(pk=PageCacheTestCase.user_author.pk)
+        author.first_name = 'Renamed'
+        author.save()
+        group = Group.objects.get(pk=PageCacheTestCase.group.pk)
+        group.title = 'renamed group'
+        group.save()
+        for url in (detail_url, *PageCacheTestCase.urls[:2]):
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), 'Renamed')
+        for url in (detail_url, PageCacheTestCase.urls[0],
+                    PageCacheTestCase.urls[2]):
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), 'renamed group')
+
+
+class LookupCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Author')
+        cls.group = Group.objects.create(title='test group', slug='test_slug')
+        cls.client_guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_are_cached(self):
+        """Groups and users are read from the database once."""
+        lookups.get_group('test_slug')
+        lookups.get_user('Author')
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.get_group('test_slug'),
+                             LookupCacheTestCase.group)
+            self.assertEqual(lookups.get_user('Author'),
+                             LookupCacheTestCase.user)
+
+    def test_user_counters_are_cached(self):
+        """Users are cached with their counters, which stay current."""
+        lookups.get_user('Author')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                lookups.get_user('Author').stats.posts_count, 0)
+        Post.objects.create(text='Test post', author=LookupCacheTestCase.user)
+        self.assertEqual(lookups.get_user('Author').stats.posts_count, 1)
+
+    def test_missing_names_do_not_reach_database(self):
+        """Repeated requests for a missing page run no queries."""
+        url = reverse('posts:group_list', kwargs={'slug': 'missing'})
+        LookupCacheTestCase.client_guest.get(url)
+        with self.assertNumQueries(0):
+            response = LookupCacheTestCase.client_guest.get(url)
+        self.assertEqual(response.status_code, 404)
+        Group.objects.create(title='new group', slug='missing')
+        response = LookupCacheTestCase.client_guest.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_saved_objects_are_forgotten(self):
+        """Editing a group or user drops the cached lookups."""
+        group = Group.objects.get(slug='test_slug')
+        lookups.get_group('test_slug')
+        group.slug = 'new_slug'
+        group.save()
+        self.assertIsNone(lookups.get_group('test_slug'))
+        self.assertEqual(lookups.get_group('new_slug').slug, 'new_slug')
+        user = User.objects.get(username='Author')
+        lookups.get_user('Author')
+        user.first_name = 'Name'
+        user.save()
+        self.assertEqual(lookups.get_user('Author').first_name, 'Name')
+        user.delete()
+        self.assertIsNone(lookups.get_user('Author'))
+
+
+class FollowingCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Reader')
+        cls.author = User.objects.create(username='Author')
+        cls.other = User.objects.create(username='Other')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FollowingCacheTestCase.user)
+
+    def test_checks_run_no_queries(self):
+        """The follow set is loaded once and then checked in memory."""
+        user = User.objects.get(pk=FollowingCacheTestCase.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                follows.is_following(user, FollowingCacheTestCase.author))
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                follows.is_following(user, FollowingCacheTestCase.other))
+        user = User.objects.get(pk=FollowingCacheTestCase.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(follows.is_following(
+                user, FollowingCacheTestCase.author.pk))
+
+    def test_large_author_ids(self):
+        """Ids above 32 bits, which SQLite row ids allow, are cached."""
+        author = User.objects.create(pk=2 ** 40, username='Large')
+        Follow.objects.create(user=FollowingCacheTestCase.user, author=author)
+        follows.get_following(
+            User.objects.get(pk=FollowingCacheTestCase.user.pk))
+        user = User.objects.get(pk=FollowingCacheTestCase.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(follows.is_following(user, author))
+
+    def test_anonymous_user_follows_nobody(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follows.get_following(AnonymousUser()), frozenset())
+
+    def test_follow_and_unfollow_update_set(self):
+        """Following and unfollowing drop the cached set."""
+        user = FollowingCacheTestCase.user
+        other = FollowingCacheTestCase.other
+        follows.get_following(user)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Other'}))
+        fresh = User.objects.get(pk=user.pk)
+        self.assertTrue(follows.is_following(fresh, other))
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'Other'}))
+        fresh = User.objects.get(pk=user.pk)
+        self.assertFalse(follows.is_following(fresh, other))
+        self.assertTrue(
+            follows.is_following(fresh, FollowingCacheTestCase.author))
+
+    def test_stale_set_does_not_block_unfollow(self):
+        """Unfollowing deletes the follow the cached set misses."""
+        user = FollowingCacheTestCase.user
+        # Rows changed without signals leave the cached set stale.
+        follows.get_following(User.objects.get(pk=user.pk))
+        Follow.objects.bulk_create(
+            [Follow(user=user, author=FollowingCacheTestCase.other)])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'Other'}))
+        self.assertFalse(Follow.objects.filter(
+            user=user, author=FollowingCacheTestCase.other).exists())
+        Follow.objects.filter(
+            user=user, author=FollowingCacheTestCase.author).delete()
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Author'}))
+        self.assertTrue(follows.is_following(
+            User.objects.get(pk=user.pk), FollowingCacheTestCase.author))
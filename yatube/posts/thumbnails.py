@@ -0,0 +1,58 @@
+"""Thumbnails of post images made when the image is uploaded.
+
+Pages read the stored variant names and never resize images while
+rendering. Until the worker has made the variants, the original image
+is shown.
+"""
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.page_cache import purge
+from core.storage import release, retain
+from core.tasks import run_in_background
+
+from .feed_cache import invalidate_posts, post_page_key
+from .images import ARTICLE_WIDTH, save_variants
+from .models import Post
+
+
+def make_thumbnails(post_id, invalidate=True):
+    """Make the variants of the post image and store their metadata and
+    the description of the image.
+
+    Return True if they were stored. Without invalidate the caller drops
+    the cached feeds, e.g. once per batch of posts.
+    """
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'image_variants', 'author', 'group').first()
+    if post is None or not post.image:
+        return False
+    saved_media = post.media_names
+    variants, description = save_variants(post.image)
+    thumbnail = [variant for variant in variants
+                 if variant['width'] <= ARTICLE_WIDTH] or variants
+    post.image_variants = json.dumps(variants)
+    with transaction.atomic():
+        # The image may have been replaced while the variants were made.
+        stored = Post.objects.filter(
+            pk=post_id, image=post.image.name).update(
+                thumbnail=thumbnail[-1]['jpeg'],
+                image_variants=post.image_variants,
+                updated=timezone.now(),
+                **description)
+        if stored:
+            retain(post.media_names - saved_media)
+            release(saved_media - post.media_names, post.image.storage)
+    if stored:
+        purge(post_page_key(post_id))
+    if stored and invalidate:
+        invalidate_posts([post])
+    return bool(stored)
+
+
+def schedule_thumbnails(post):
+    """Make the thumbnails of a newly uploaded post image in the worker."""
+    if post.image:
+        run_in_background(make_thumbnails, post.pk)
@@ -0,0 +1,139 @@
+"""Materialized follow feed.
+
+New posts are fanned out to TimelineEntry rows of the author's followers,
+so the follow feed is read with one range scan over (user, pub_date,
+post). Authors with more than FOLLOW_TIMELINE_FANOUT_LIMIT followers are
+not fanned out: their new posts are pulled into the timeline of a
+follower when the follower reads the feed.
+"""
+from django.conf import settings
+from django.db.models import F, OuterRef, Q, Subquery
+
+from core.tasks import run_in_background
+
+from .feed_cache import invalidate_follow_counts
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE = 500
+# Feed order and cursor fields: the columns of the timeline index.
+DATE_FIELD = 'timeline_entries__pub_date'
+ID_FIELD = 'timeline_entries__post__id'
+
+
+def pull_authors():
+    """Return the filter of the UserStats of the authors whose posts are
+    pulled instead of pushed, the one rule of fan_out and pulls.
+    """
+    return Q(followers_count__gt=settings.FOLLOW_TIMELINE_FANOUT_LIMIT)
+
+
+def is_pull_author(author_id):
+    """Return True if posts of the author are pulled instead of pushed."""
+    return UserStats.objects.filter(pull_authors(), pk=author_id).exists()
+
+
+def fan_out(posts):
+    """Deliver new posts to the timelines of their authors' followers."""
+    entries = []
+    for author_id in {post.author_id for post in posts}:
+        if is_pull_author(author_id):
+            continue
+        followers = list(Follow.objects.filter(
+            author=author_id).values_list('user', flat=True))
+        entries.extend(
+            TimelineEntry(user_id=user_id, post=post, author_id=author_id,
+                          pub_date=post.pub_date)
+            for post in posts if post.author_id == author_id
+            for user_id in followers
+        )
+        invalidate_follow_counts(followers)
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def backfill(user, author):
+    """Copy the existing posts of a newly followed author to the timeline."""
+    invalidate_follow_counts([user.pk])
+    posts = Post.objects.filter(author=author).values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=pk, author=author, pub_date=date)
+         for pk, date in posts.iterator()],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user, author):
+    """Remove the posts of an unfollowed author from the timeline."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+    invalidate_follow_counts([user.pk])
+
+
+def pull(user_id, author_id, since=None):
+    """Copy the posts of the author published since the newest one in
+    the timeline of the user, which is read unless given as since.
+    """
+    if since is None:
+        since = TimelineEntry.objects.filter(
+            user=user_id, author=author_id).order_by('-pub_date').values_list(
+                'pub_date', flat=True).first()
+    posts = Post.objects.filter(author=author_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gte=since).exclude(
+            timeline_entries__user=user_id)
+    entries = [TimelineEntry(user_id=user_id, post_id=pk,
+                             author_id=author_id, pub_date=date)
+               for pk, date in posts.values_list('pk', 'pub_date')]
+    if entries:
+        TimelineEntry.objects.bulk_create(
+            entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        invalidate_follow_counts([user_id])
+
+
+def catch_up(author_id):
+    """Pull the posts an author published while pulled into the timelines
+    of the followers, once the author's new posts are pushed again.
+    """
+    if is_pull_author(author_id):
+        return
+    user_ids = Follow.objects.filter(author=author_id).values_list(
+        'user', flat=True)
+    for user_id in user_ids.iterator():
+        pull(user_id, author_id)
+
+
+def schedule_catch_up(author_id):
+    """Catch up the timelines of the author's followers in the background
+    if an unfollow has just brought the author to the fan-out limit.
+    """
+    if UserStats.objects.filter(
+            pk=author_id,
+            followers_count=settings.FOLLOW_TIMELINE_FANOUT_LIMIT).exists():
+        run_in_background(catch_up, author_id)
+
+
+def get_follow_feed(user):
+    """Return the QuerySet of posts of the authors the user follows,
+    newest first by DATE_FIELD and ID_FIELD.
+
+    Posts of pull authors newer than the timeline are pulled first. One
+    query finds the authors with such posts, so a read with nothing to
+    pull writes nothing.
+    """
+    newest_posts = Post.objects.filter(
+        author=OuterRef('pk')).order_by('-pub_date').values('pub_date')[:1]
+    stale_authors = UserStats.objects.filter(
+        pull_authors(), user__following__user=user,
+    ).annotate(
+        newest_post=Subquery(newest_posts),
+        newest_pulled=Subquery(TimelineEntry.objects.filter(
+            user=user, author=OuterRef('pk'),
+        ).order_by('-pub_date').values('pub_date')[:1]),
+    ).filter(
+        Q(newest_pulled__isnull=True) | Q(newest_pulled__lt=F('newest_post')),
+        newest_post__isnull=False,
+    ).values_list('pk', 'newest_pulled')
+    for author_id, newest_pulled in stale_authors:
+        pull(user.pk, author_id, since=newest_pulled)
+    return Post.objects.filter(timeline_entries__user=user).order_by(
+        f'-{DATE_FIELD}', f'-{ID_FIELD}')
@@ -1,58 +1,166 @@
+from itertools import chain
+
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Max, Sum
 from django.shortcuts import get_object_or_404, redirect, render
-from yatube.settings import PAGINATOR_NUM_PAGE
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+from yatube.settings import (COMMENTS_NUM_PAGE, FEED_CACHE_TIMEOUT,
+                             PAGINATOR_KEYSET, PAGINATOR_NUM_PAGE,
+                             STREAMING_VIEWS)
+
+from core.cache import get_generation
+from core.page_cache import add_surrogate_keys, may_cache
+from core.streaming import render_stream
 
+from . import conditional, feed_cache, follows, lookups, search
+from .articles import stream_articles
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Post, UserStats
+from .paginators import CachedCountPaginator, KeysetPaginator
+from .thumbnails import schedule_thumbnails
+from .timeline import DATE_FIELD, ID_FIELD, get_follow_feed
+
 
+def get_page_obj(request, post_list, count_key=None, estimate=None,
+                 stored_count=None, **keyset_fields):
+    """Get request and QuerySet object, return page object.
 
-def get_page_obj(request, post_list):
-    """Get request and QuerySet object, return page object"""
-    paginator = Paginator(post_list, PAGINATOR_NUM_PAGE)
+    Cursor pages are used for ?after= and ?before= requests and, when
+    PAGINATOR_KEYSET is on, for every request without ?page=; they are
+    ordered by the keyset_fields of KeysetPaginator. Numbered pages
+    cache the count under count_key and use the stored_count, or may
+    use the estimate.
+    """
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before or (
+            PAGINATOR_KEYSET and 'page' not in request.GET):
+        paginator = KeysetPaginator(
+            post_list, PAGINATOR_NUM_PAGE, **keyset_fields)
+        return paginator.get_cursor_page(after=after, before=before)
+    paginator = CachedCountPaginator(
+        post_list, PAGINATOR_NUM_PAGE, count_key=count_key, estimate=estimate,
+        stored_count=stored_count)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def render_feed(request, template, context):
+    """Render the feed page, streaming its posts one by one if the view
+    is listed in STREAMING_VIEWS.
+    """
+    if may_cache(request):
+        # Only a page stored whole names the posts it shows: members get
+        # the posts from the fragment cache without querying the page.
+        add_surrogate_keys(request, *chain.from_iterable(
+            map(feed_cache.post_keys, context['page_obj'])))
+    if request.resolver_match.view_name not in STREAMING_VIEWS:
+        return render(request, template, context)
+    return render_stream(request, template, context, context['page_obj'],
+                         stream_articles, separator='<hr>')
+
+
+def get_comments_page(request, post_id):
+    """Return the page of comments of the post after the ?after= cursor."""
+    comment_list = Comment.objects.filter(
+        post=post_id).select_related('author')
+    paginator = KeysetPaginator(
+        comment_list, COMMENTS_NUM_PAGE, date_field='created')
+    return paginator.get_cursor_page(after=request.GET.get('after'))
+
+
+@condition(etag_func=conditional.index_etag)
 def index(request):
     """Displays all posts on the site.  For all users."""
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    page_obj = get_page_obj(request, post_list)
-    context = {'page_obj': page_obj}
+    add_surrogate_keys(request, feed_cache.INDEX_PAGE_KEY)
+    post_list = Post.objects.for_feed()
+    generation = get_generation(feed_cache.INDEX_SCOPE)
+    page_obj = get_page_obj(
+        request, post_list,
+        count_key=feed_cache.count_key(feed_cache.INDEX_SCOPE, generation),
+        estimate=lambda: Post.objects.aggregate(Max('pk'))['pk__max'] or 0)
+    context = {'page_obj': page_obj,
+               'cache_timeout': FEED_CACHE_TIMEOUT,
+               'cache_generation': generation}
+    return render_feed(request, template, context)
+
+
+def search_posts(request):
+    """Displays the posts and comments matching the query. For all users."""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search.search(query), PAGINATOR_NUM_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {'query': query, 'page_obj': page_obj,
+               'page_query': urlencode({'q': query})}
     return render(request, template, context)
 
 
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
     """Displays all posts of the topic group. For all users."""
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = get_page_obj(request, post_list)
-    context = {'group': group, 'page_obj': page_obj}
-    return render(request, template, context)
+    add_surrogate_keys(request, feed_cache.group_page_key(slug))
+    group = lookups.get_group_or_404(slug)
+    post_list = group.posts.for_feed()
+    scope = feed_cache.group_scope(group.pk)
+    generation = get_generation(scope)
+    page_obj = get_page_obj(
+        request, post_list,
+        count_key=feed_cache.count_key(scope, generation),
+        stored_count=lambda: group.posts_count)
+    context = {'group': group, 'page_obj': page_obj,
+               'cache_timeout': FEED_CACHE_TIMEOUT,
+               'cache_generation': generation}
+    return render_feed(request, template, context)
 
 
+@condition(etag_func=conditional.profile_etag)
 def profile(request, username):
     """Displays all posts of the selected author. For all users."""
     template = 'posts/profile.html'
     user = request.user
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = get_page_obj(request, post_list)
-    following = user.is_authenticated and Follow.objects.filter(
-        user=user, author=author).exists()
-    context = {'page_obj': page_obj, 'author': author, 'following': following}
-    return render(request, template, context)
+    add_surrogate_keys(request, feed_cache.author_page_key(username))
+    author = lookups.get_user_or_404(username)
+    post_list = author.posts.for_feed()
+    scope = feed_cache.author_scope(author.pk)
+    generation = get_generation(scope)
+    page_obj = get_page_obj(
+        request, post_list,
+        count_key=feed_cache.count_key(scope, generation),
+        stored_count=lambda: author.stats.posts_count)
+    following = follows.is_following(user, author)
+    context = {'page_obj': page_obj, 'author': author, 'following': following,
+               'cache_timeout': FEED_CACHE_TIMEOUT,
+               'cache_generation': feed_cache.profile_generation(
+                   author.pk, generation)}
+    return render_feed(request, template, context)
 
 
+@condition(etag_func=conditional.post_etag,
+           last_modified_func=conditional.post_last_modified)
 def post_detail(request, post_id):
     """Displays detailed information about the post. Authorized users only."""
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comment_list = post.comments.all()
+    add_surrogate_keys(request, feed_cache.post_page_key(post_id))
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    add_surrogate_keys(request, *feed_cache.post_keys(post))
+    comments = get_comments_page(request, post.pk)
     form = CommentForm()
-    context = {'post': post, 'form': form, 'comments': comment_list}
+    context = {'post': post, 'form': form, 'comments': comments}
+    return render(request, template, context)
+
+
+def post_comments(request, post_id):
+    """Displays the next batch of comments of the post. For all users."""
+    template = 'posts/includes/comment_list.html'
+    add_surrogate_keys(request, feed_cache.post_page_key(post_id))
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_comments_page(request, post.pk)
+    context = {'post': post, 'comments': comments}
     return render(request, template, context)
 
 
@@ -67,6 +175,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnails(post)
         return redirect('posts:profile', request.user)
     return render(request, template, context)
 
@@ -82,7 +191,12 @@ def post_edit(request, post_id):
                     instance=post)
     context = {'is_edit': True, 'form': form}
     if form.is_valid():
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            post.thumbnail = post.image_variants = ''
         form.save()
+        if image_changed:
+            schedule_thumbnails(post)
         return redirect(post)
     return render(request, 'posts/create_post.html', context)
 
@@ -106,19 +220,29 @@ def follow_index(request):
     Authorized users only.
     """
     template = 'posts/follow_index.html'
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_obj(request, post_list)
+    user = request.user
+    post_list = get_follow_feed(user).for_feed()
+    page_obj = get_page_obj(
+        request, post_list,
+        count_key=feed_cache.follow_count_key(user.pk),
+        estimate=lambda: UserStats.objects.filter(
+            user__following__user=user
+        ).aggregate(Sum('posts_count'))['posts_count__sum'] or 0,
+        date_field=DATE_FIELD, id_field=ID_FIELD)
     context = {'page_obj': page_obj, 'follow': True, }
-    return render(request, template, context)
+    return render_feed(request, template, context)
 
 
 @login_required
 def profile_follow(request, username):
     """Adds this author to subscription list. Authorized users only."""
     user = request.user
-    author = get_object_or_404(User, username=username)
+    author = lookups.get_user_or_404(username)
     if user != author:
         Follow.objects.get_or_create(user=user, author=author)
+        # The cached set is only read to render the follow state; it is
+        # dropped even if no row changed, in case it went stale.
+        follows.forget_following(user.pk)
     return redirect('posts:profile', username=username)
 
 
@@ -126,8 +250,7 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     """Deletes this author from subscription list. Authorized users only."""
     user = request.user
-    author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=user, author=author)
-    if follow.exists():
-        follow.delete()
+    author = lookups.get_user_or_404(username)
+    Follow.objects.filter(user=user, author=author).delete()
+    follows.forget_following(user.pk)
     return redirect('posts:profile', username=username)
@@ -0,0 +1,66 @@
+"""Authentication backend reading the users of sessions from the cache.
+
+A snapshot of the user is cached for USER_CACHE_TIMEOUT and dropped
+when the user is saved or deleted. The snapshot leaves the password
+hash out: the user is restored with the password deferred, and the
+session is verified against the cached session auth hash instead, so
+changing the password still ends the other sessions of the user.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PASSWORD_FIELD = 'password'
+
+
+def user_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def forget_user(user_id):
+    """Drop the cached snapshot of the user."""
+    cache.delete(user_key(user_id))
+
+
+def _session_auth_hash(user, cached_hash):
+    # A password set on the restored user is hashed as usual.
+    if PASSWORD_FIELD in user.get_deferred_fields():
+        return cached_hash
+    return type(user).get_session_auth_hash(user)
+
+
+def make_snapshot(user):
+    """Return the cached values of the user, without the password."""
+    values = {field.attname: getattr(user, field.attname)
+              for field in user._meta.concrete_fields
+              if field.attname != PASSWORD_FIELD}
+    return values, user.get_session_auth_hash()
+
+
+def restore_snapshot(snapshot):
+    """Return the user of the snapshot with the password deferred."""
+    values, session_auth_hash = snapshot
+    user = get_user_model().from_db(
+        DEFAULT_DB_ALIAS, list(values), list(values.values()))
+    user.get_session_auth_hash = partial(
+        _session_auth_hash, user, session_auth_hash)
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend resolving the user of a session without a query."""
+
+    def get_user(self, user_id):
+        snapshot = cache.get(user_key(user_id))
+        if snapshot is not None:
+            user = restore_snapshot(snapshot)
+        else:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(user_key(user_id), make_snapshot(user),
+                          settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .backends import user_key
+
+User = get_user_model()
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['users.backends.CachedModelBackend'])
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('Author', password='secret')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_session_and_user_are_read_from_cache(self):
+        """An authenticated request to a static page runs no queries."""
+        self.client.get(reverse('about:author'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_profile_update_is_seen(self):
+        """An edited user is read again from the database."""
+        self.client.get(reverse('about:author'))
+        self.user.first_name = 'Name'
+        self.user.save()
+        response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.context['user'].first_name, 'Name')
+
+    def test_password_change_ends_sessions(self):
+        """Changing the password logs the other sessions out."""
+        self.client.get(reverse('about:author'))
+        self.user.set_password('changed')
+        self.user.save()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertRedirects(
+            response, f"{reverse('users:login')}?next="
+            f"{reverse('posts:follow_index')}")
+
+    def test_password_hash_is_not_cached(self):
+        """The cached user holds no password and loads it on access."""
+        self.client.get(reverse('about:author'))
+        self.assertNotIn(self.user.password, str(cache.get(user_key(
+            self.user.pk))))
+        user = self.client.get(reverse('about:author')).context['user']
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertTrue(user.check_password('secret'))
+
+    def test_own_password_change_keeps_session(self):
+        """The session changing the password stays logged in."""
+        self.client.get(reverse('about:author'))
+        self.client.post(reverse('users:password_change'), {
+            'old_password': 'secret', 'new_password1': 'Changed-secret-1',
+            'new_password2': 'Changed-secret-1'})
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
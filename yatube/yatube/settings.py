@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.page_cache.AnonymousPageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -100,6 +101,10 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
+# With a shared cache (CACHE_LOCATION) sessions and the users of sessions
+# are read from the cache, falling back to the database
+USER_CACHE_TIMEOUT = 60 * 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -131,6 +136,21 @@ USE_TZ = True
 # Mesia file settings
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Uploads are named by content hash in shard directories, see core.storage
+DEFAULT_FILE_STORAGE = 'core.storage.HashedStorage'
+# Files without references are deleted after this many seconds
+STORED_FILE_GRACE_PERIOD = 60 * 60
+# Media are sent by Python, or by the front server for 'x-accel-redirect'
+# (nginx, internal location MEDIA_ACCEL_PREFIX) and 'x-sendfile'
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Post images are refused above IMAGE_MAX_PIXELS, bounded to
+# IMAGE_MAX_SIDE and resized to variants of these widths for srcset
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_MAX_SIDE = 2560
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
@@ -140,10 +160,55 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 # Paginator settings
 PAGINATOR_NUM_PAGE = 10
+COMMENTS_NUM_PAGE = 20
+# Feeds with more posts show an estimated count, e.g. "of ~12000"
+PAGINATOR_ESTIMATE_ABOVE = 10000
+# Serve feeds with cursor (?after=/?before=) pages unless ?page= is given
+PAGINATOR_KEYSET = False
+
+# Feed views (URL names) that stream their posts as they are rendered
+STREAMING_VIEWS = []
+
+# Follow feed: authors with more followers are pulled, not fanned out
+FOLLOW_TIMELINE_FANOUT_LIMIT = 10000
+
+# Background tasks: threads of the local worker in every web process
+BACKGROUND_WORKERS = 2
+# Run background tasks at once in the calling thread (tests, debugging)
+BACKGROUND_TASKS_EAGER = False
 
 # Caches
+# Cached feed fragments are also dropped when their posts change
+FEED_CACHE_TIMEOUT = 60 * 10
+# Groups and users named in URLs are cached, missing names for less time
+LOOKUP_CACHE_TIMEOUT = 60 * 60
+LOOKUP_CACHE_MISSING_TIMEOUT = 60
+# Ids of the authors a user follows, dropped on follow and unfollow
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
+# Pages tagged with surrogate keys are served to anonymous visitors from
+# the cache until a key is purged, for this long at most
+PAGE_CACHE_TIMEOUT = 60
+# The web processes of a host share the cache in CACHE_LOCATION. Without
+# it every process has its own memory cache, as in tests: deployments
+# with several web processes must set it, since cache generations,
+# lookups and follow sets are invalidated across processes only through
+# the shared cache (checked by manage.py check --deploy).
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+if CACHE_LOCATION:
+    CACHES['default'] = {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100 * 1000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    }
+    # A logout or password change in one process is seen by the others
+    # only through a shared cache.
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
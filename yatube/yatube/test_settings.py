@@ -0,0 +1,6 @@
+"""Settings of the test runs: manage.py test and pytest."""
+from .settings import *  # noqa: F401, F403
+
+# Worker threads cannot write to the in-memory test database while a
+# test holds it, so background tasks run in the test's thread.
+BACKGROUND_TASKS_EAGER = True